@@ -0,0 +1,352 @@
+// Streamliner in-system UDP DMA benchmark.
+//
+// Boot with: litex_term /dev/ttyUSBX --kernel dma_bench.bin
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#include <irq.h>
+#include <system.h>
+#include <libbase/uart.h>
+#include <libbase/console.h>
+#include <generated/csr.h>
+#include <generated/mem.h>
+#include <generated/soc.h>
+
+// Benchmark buffer in the upper half of main_ram, the firmware runs from the lower half.
+#define DMA_BENCH_BASE (MAIN_RAM_BASE + MAIN_RAM_SIZE/2)
+#define DMA_BENCH_SIZE (MAIN_RAM_SIZE/2)
+
+// Largest UDP payload without IP fragmentation (MTU 1500).
+#define UDP_MAX_PAYLOAD 1472
+
+/*-----------------------------------------------------------------------*/
+/* Uart                                                                  */
+/*-----------------------------------------------------------------------*/
+
+static char *readstr(void)
+{
+	char c[2];
+	static char s[64];
+	static int ptr = 0;
+
+	if(readchar_nonblock()) {
+		c[0] = getchar();
+		c[1] = 0;
+		switch(c[0]) {
+			case 0x7f:
+			case 0x08:
+				if(ptr > 0) {
+					ptr--;
+					fputs("\x08 \x08", stdout);
+				}
+				break;
+			case 0x07:
+				break;
+			case '\r':
+			case '\n':
+				s[ptr] = 0x00;
+				fputs("\n", stdout);
+				ptr = 0;
+				return s;
+			default:
+				if(ptr >= (sizeof(s) - 1))
+					break;
+				fputs(c, stdout);
+				s[ptr] = c[0];
+				ptr++;
+				break;
+		}
+	}
+
+	return NULL;
+}
+
+static char *get_token(char **str)
+{
+	char *c, *d;
+
+	c = (char *)strchr(*str, ' ');
+	if(c == NULL) {
+		d = *str;
+		*str = *str+strlen(*str);
+		return d;
+	}
+	*c = 0;
+	d = *str;
+	*str = c+1;
+	return d;
+}
+
+static void prompt(void)
+{
+	printf("\e[92;1mstreamliner\e[0m> ");
+}
+
+/*-----------------------------------------------------------------------*/
+/* Timer                                                                 */
+/*-----------------------------------------------------------------------*/
+
+// timer0 is a 32-bit down-counter that wraps after 2^32 cycles (~71s at 60MHz), timer_ticks
+// extends it to 64 bits and has to be called more often than that (e.g. while polling).
+static uint32_t timer_last;
+static uint64_t timer_total;
+
+static void timer_start(void)
+{
+	timer0_en_write(0);
+	timer0_reload_write(0xffffffff);
+	timer0_load_write(0xffffffff);
+	timer0_en_write(1);
+	timer0_update_value_write(1);
+	timer_last  = timer0_value_read();
+	timer_total = 0;
+}
+
+static uint64_t timer_ticks(void)
+{
+	uint32_t now;
+
+	timer0_update_value_write(1);
+	now          = timer0_value_read();
+	timer_total += (uint32_t)(timer_last - now);
+	timer_last   = now;
+	return timer_total;
+}
+
+/*-----------------------------------------------------------------------*/
+/* DMA                                                                   */
+/*-----------------------------------------------------------------------*/
+
+#ifdef CSR_WB_UDP_TX_DMA_BASE
+static uint32_t dma_dst_ip   = (192 << 24) | (168 << 16) | (1 << 8) | 100;
+static uint16_t dma_dst_port = 5123;
+#ifdef CSR_WB_UDP_TX_DMA_DST_IP2_ADDR
+static uint32_t dma_dst_ip2  = (192 << 24) | (168 << 16) | (2 << 8) | 100;
+#endif
+
+static int parse_ip(char *str, uint32_t *ip)
+{
+	char *c;
+	int i;
+
+	*ip = 0;
+	for(i = 0; i < 4; i++) {
+		uint32_t byte = strtoul(str, &c, 0);
+		if((c == str) || (byte > 255) || ((i < 3) && (*c != '.')) || ((i == 3) && (*c != 0)))
+			return 0;
+		*ip = (*ip << 8) | byte;
+		str = c + 1;
+	}
+	return 1;
+}
+
+static void dma_fill(uint32_t base, uint32_t size)
+{
+	volatile uint32_t *array = (uint32_t *)base;
+	uint32_t i;
+
+	for(i = 0; i < size/4; i++)
+		array[i] = i;
+
+	flush_cpu_dcache();
+#ifdef CONFIG_L2_SIZE
+	flush_l2_cache();
+#endif
+}
+
+static void dma_transfer(uint32_t base, uint32_t rows, uint32_t length)
+{
+	// rows == 0: one packet of length bytes, else rows packets of length bytes back to back.
+	// Shadow registers: loaded on enable, or on commit once the previous transfer is done.
+	wb_udp_tx_dma_base_write(base);
+	wb_udp_tx_dma_length_write(length);
+	wb_udp_tx_dma_rows_write(rows);
+	wb_udp_tx_dma_row_length_write(length);
+	wb_udp_tx_dma_row_stride_write(length);
+	if(wb_udp_tx_dma_enable_read())
+		wb_udp_tx_dma_commit_write(1);
+	else
+		wb_udp_tx_dma_enable_write(1);
+	while(wb_udp_tx_dma_pending_read())
+		timer_ticks();
+	while(!wb_udp_tx_dma_done_read())
+		timer_ticks();
+}
+
+static void dma_dest(char *ip, char *port, char *ip2)
+{
+	char *c;
+	uint32_t addr;
+	uint32_t p;
+
+	if((*ip == 0) || (*port == 0)) {
+		printf("dma_dest <ip> <port> [ip2]\n");
+		return;
+	}
+	if(!parse_ip(ip, &addr)) {
+		printf("Incorrect ip\n");
+		return;
+	}
+	p = strtoul(port, &c, 0);
+	if((*c != 0) || (p > 0xffff)) {
+		printf("Incorrect port\n");
+		return;
+	}
+#ifdef CSR_WB_UDP_TX_DMA_DST_IP2_ADDR
+	// Destination of the second link (dual PHY).
+	if(*ip2 != 0) {
+		uint32_t addr2;
+		if(!parse_ip(ip2, &addr2)) {
+			printf("Incorrect ip2\n");
+			return;
+		}
+		dma_dst_ip2 = addr2;
+	}
+#endif
+	dma_dst_ip   = addr;
+	dma_dst_port = p;
+}
+
+static void dma_speed(char *size, char *loops, char *pkt_size)
+{
+	char *c;
+	uint32_t s, l, p;
+	uint32_t i, row, rows, rem;
+	uint64_t ticks, bytes, packets;
+
+	if(*size == 0) {
+		printf("dma_speed <size> [loops] [pkt_size]\n");
+		return;
+	}
+	s = strtoul(size, &c, 0);
+	if((*c != 0) || (s == 0) || (s > DMA_BENCH_SIZE) || (s & 3)) {
+		printf("Incorrect size\n");
+		return;
+	}
+	l = 1;
+	if(*loops != 0) {
+		l = strtoul(loops, &c, 0);
+		if((*c != 0) || (l == 0)) {
+			printf("Incorrect loops\n");
+			return;
+		}
+	}
+	p = 1024;
+	if(*pkt_size != 0) {
+		p = strtoul(pkt_size, &c, 0);
+		if((*c != 0) || (p == 0) || (p > UDP_MAX_PAYLOAD) || (p & 3)) {
+			printf("Incorrect pkt_size\n");
+			return;
+		}
+	}
+
+	dma_fill(DMA_BENCH_BASE, s);
+
+	wb_udp_tx_dma_enable_write(0);
+	wb_udp_tx_dma_loop_write(0);
+	wb_udp_tx_dma_row_packets_write(1);
+	wb_udp_tx_dma_srcdst_port_write((dma_dst_port << 16) | dma_dst_port);
+	wb_udp_tx_dma_dst_ip_write(dma_dst_ip);
+#ifdef CSR_WB_UDP_TX_DMA_DST_IP2_ADDR
+	wb_udp_tx_dma_dst_ip2_write(dma_dst_ip2);
+#endif
+
+	// The whole region as one 2D transfer of pkt_size rows (the rows CSR is 16-bit, larger
+	// regions take several), the remainder as a final linear packet.
+	rows = s/p;
+	rem  = s%p;
+	timer_start();
+	for(i = 0; i < l; i++) {
+		for(row = 0; row < rows; row += 0xffff)
+			dma_transfer(DMA_BENCH_BASE + row*p, (rows - row) < 0xffff ? (rows - row) : 0xffff, p);
+		if(rem)
+			dma_transfer(DMA_BENCH_BASE + rows*p, 0, rem);
+	}
+	// done only means all words were read, wait until they were handed to the UDP core
+	// (at most the last packet is then still in the core).
+	while(wb_udp_tx_dma_busy_read())
+		timer_ticks();
+	ticks = timer_ticks();
+	wb_udp_tx_dma_enable_write(0);
+	packets = (uint64_t)(rows + (rem != 0))*l;
+
+	if(ticks == 0)
+		ticks = 1;
+	bytes   = (uint64_t)s*l;
+	bytes   = bytes*CONFIG_CLOCK_FREQUENCY/ticks;
+	packets = packets*CONFIG_CLOCK_FREQUENCY/ticks;
+	printf("DMA speed: %lu.%02luMB/s, %lupkt/s (%lums)\n",
+		(unsigned long)(bytes/1000000),
+		(unsigned long)((bytes/10000)%100),
+		(unsigned long)packets,
+		(unsigned long)(ticks/(CONFIG_CLOCK_FREQUENCY/1000)));
+}
+#endif
+
+/*-----------------------------------------------------------------------*/
+/* Console service / Main                                                */
+/*-----------------------------------------------------------------------*/
+
+static void help(void)
+{
+	puts("\nStreamliner DMA benchmark, available commands:");
+	puts("help                                  - Show this command");
+	puts("reboot                                - Reboot CPU");
+#ifdef CSR_WB_UDP_TX_DMA_BASE
+	puts("dma_dest <ip> <port> [ip2]            - Set benchmark destination (ip2: second PHY)");
+	puts("dma_speed <size> [loops] [pkt_size]   - Run UDP DMA benchmark");
+#endif
+}
+
+static void reboot_cmd(void)
+{
+	ctrl_reset_write(1);
+}
+
+static void console_service(void)
+{
+	char *str;
+	char *token;
+
+	str = readstr();
+	if(str == NULL) return;
+	token = get_token(&str);
+	if(strcmp(token, "help") == 0)
+		help();
+	else if(strcmp(token, "reboot") == 0)
+		reboot_cmd();
+#ifdef CSR_WB_UDP_TX_DMA_BASE
+	else if(strcmp(token, "dma_dest") == 0) {
+		char *ip   = get_token(&str);
+		char *port = get_token(&str);
+		dma_dest(ip, port, get_token(&str));
+	}
+	else if(strcmp(token, "dma_speed") == 0) {
+		char *size  = get_token(&str);
+		char *loops = get_token(&str);
+		dma_speed(size, loops, get_token(&str));
+	}
+#endif
+	prompt();
+}
+
+int main(void)
+{
+#ifdef CONFIG_CPU_HAS_INTERRUPT
+	irq_setmask(0);
+	irq_setie(1);
+#endif
+	uart_init();
+
+	puts("\nStreamliner DMA benchmark built "__DATE__" "__TIME__"\n");
+	help();
+	prompt();
+
+	while(1) {
+		console_service();
+	}
+
+	return 0;
+}
@@ -0,0 +1,177 @@
+"""UDP command channel for the UDP DMA."""
+
+from migen import *
+from migen.genlib.cdc import PulseSynchronizer, BusSynchronizer
+
+from litex.gen import *
+
+from litex.soc.interconnect import stream
+
+from modules.udp_core import udp_stream_descr
+
+# Protocol -----------------------------------------------------------------------------------------
+
+# Datagrams to the command port, 32-bit big-endian words:
+#   request : MAGIC << 16 | opcode, [base, length, dst_ip, srcdst_port]    (arguments for START)
+#   reply   : MAGIC << 16 | opcode, flags (bit0: enable, bit1: done), offset, packets
+# The reply is sent from the command port back to the sender's IP/port. Any opcode is answered
+# with a status reply. For START/STOP the status is sampled once the command took effect (the
+# START configuration is loaded, the STOP reached the end of the packet being read), otherwise
+# when the request is received.
+
+CMD_MAGIC  = 0x534c # "SL"
+CMD_START  = 0x01
+CMD_STOP   = 0x02
+CMD_STATUS = 0x03
+
+# UdpCommandDecoder --------------------------------------------------------------------------------
+
+class UdpCommandDecoder(LiteXModule):
+    """Start/stop/monitor a UdpWishboneDMAReader with UDP datagrams.
+
+    Only datagrams to `port` are decoded, everything else is dropped. sink/source are in the
+    eth_50 domain, commands are handed to the DMA (sys domain) through its remote_* signals.
+
+    Parameters
+    ----------
+    dma : UdpWishboneDMAReader
+        DMA to control, built with_remote.
+
+    port : int
+        UDP command port.
+
+    settle_cycles : int
+        eth_50 cycles after a START/STOP until the synchronized status reflects it (pulse and
+        status crossing); the reply then waits for pending/stopping to clear (or a timeout).
+
+    Attributes
+    ----------
+    sink : Endpoint(udp_stream_descr)
+        Received datagrams (UdpCore.source).
+
+    source : Endpoint(udp_stream_descr)
+        Reply datagrams (to be arbitrated into UdpCore.sink).
+    """
+    def __init__(self, dma, port=5000, settle_cycles=64):
+        self.sink   = sink   = stream.Endpoint(udp_stream_descr())
+        self.source = source = stream.Endpoint(udp_stream_descr())
+
+        # # #
+
+        # Status: DMA (sys) -> eth_50.
+        self.status = status = BusSynchronizer(2 + 32 + 32 + 2, "sys", "eth_50")
+        self.comb += status.i.eq(Cat(
+            dma._enable.storage,
+            dma._done.status,
+            dma._offset.status,
+            dma._packets.status,
+            dma._pending.status,
+            dma.stopping))
+        pending  = status.o[66]
+        stopping = status.o[67]
+
+        # Commands: eth_50 -> DMA (sys). Arguments are held until the next request, long after the
+        # pulses crossed.
+        self.start_ps = start_ps = PulseSynchronizer("eth_50", "sys")
+        self.stop_ps  = stop_ps  = PulseSynchronizer("eth_50", "sys")
+        args = [Signal(32) for _ in range(4)]
+        self.comb += [
+            dma.remote_start.eq(start_ps.o),
+            dma.remote_stop.eq(stop_ps.o),
+            dma.remote_base.eq(args[0]),
+            dma.remote_length.eq(args[1]),
+            dma.remote_dst_ip.eq(args[2]),
+            dma.remote_srcdst_port.eq(args[3]),
+        ]
+
+        # Request decoding / reply.
+        opcode    = Signal(8)
+        index     = Signal(max=len(args) + 1)
+        peer_ip   = Signal(32)
+        peer_port = Signal(16)
+        latched   = Signal(len(status.o))
+        settle    = Signal(max=settle_cycles + 1)
+        timeout   = Signal(20)
+
+        reply = Array([
+            Cat(opcode, Constant(0, 8), Constant(CMD_MAGIC, 16)),
+            latched[0:2],
+            latched[2:34],
+            latched[34:66],
+        ])
+
+        self.fsm = fsm = ClockDomainsRenamer("eth_50")(FSM(reset_state="IDLE"))
+        fsm.act("IDLE",
+            sink.ready.eq(1),
+            If(sink.valid,
+                NextValue(peer_ip,   sink.ip_address),
+                NextValue(peer_port, sink.src_port),
+                NextValue(opcode,    sink.data[0:8]),
+                NextValue(index,     0),
+                If((sink.dst_port == port) & (sink.data[16:32] == CMD_MAGIC),
+                    If(sink.last,
+                        NextState("EXECUTE")
+                    ).Else(
+                        NextState("ARGS")
+                    )
+                ).Elif(~sink.last,
+                    NextState("DISCARD")
+                )
+            )
+        )
+        fsm.act("ARGS",
+            sink.ready.eq(1),
+            If(sink.valid,
+                Case(index, {i: NextValue(arg, sink.data) for i, arg in enumerate(args)}),
+                If(index < len(args),
+                    NextValue(index, index + 1)
+                ),
+                If(sink.last,
+                    NextState("EXECUTE")
+                )
+            )
+        )
+        fsm.act("DISCARD",
+            sink.ready.eq(1),
+            If(sink.valid & sink.last,
+                NextState("IDLE")
+            )
+        )
+        fsm.act("EXECUTE",
+            start_ps.i.eq((opcode == CMD_START) & (index == len(args))),
+            stop_ps.i.eq(opcode == CMD_STOP),
+            NextValue(settle,  0),
+            NextValue(timeout, 0),
+            If(start_ps.i | stop_ps.i,
+                NextState("SETTLE")
+            ).Else(
+                NextValue(latched, status.o),
+                NextValue(index, 0),
+                NextState("REPLY")
+            )
+        )
+        fsm.act("SETTLE",
+            NextValue(timeout, timeout + 1),
+            If(settle != settle_cycles,
+                NextValue(settle, settle + 1)
+            ).Elif((~pending & ~stopping) | (timeout == (2**len(timeout) - 1)),
+                NextValue(latched, status.o),
+                NextValue(index, 0),
+                NextState("REPLY")
+            )
+        )
+        fsm.act("REPLY",
+            source.valid.eq(1),
+            source.data.eq(reply[index]),
+            source.last.eq(index == (len(reply) - 1)),
+            source.ip_address.eq(peer_ip),
+            source.src_port.eq(port),
+            source.dst_port.eq(peer_port),
+            source.length.eq(4*len(reply)),
+            If(source.ready,
+                NextValue(index, index + 1),
+                If(source.last,
+                    NextState("IDLE")
+                )
+            )
+        )
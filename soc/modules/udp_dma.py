@@ -5,7 +5,11 @@
 
 """UDP Direct Memory Access (DMA) TX."""
 
+from functools import reduce
+from operator import add, or_
+
 from migen import *
+from migen.genlib.cdc import BusSynchronizer
 
 from litex.gen import *
 from litex.gen.common import reverse_bytes
@@ -14,6 +18,12 @@ from litex.soc.interconnect.csr import *
 from litex.soc.interconnect import stream
 from litex.soc.interconnect import wishbone
 
+from litedram.frontend.dma import LiteDRAMDMAReader
+
+from modules.udp_fifo import UdpPacketFIFO
+from modules.udp_pack import UdpSamplePacker
+from modules.udp_stripe import UdpStriper
+
 
 # Helpers ------------------------------------------------------------------------------------------
 
@@ -27,10 +37,46 @@ class UdpWishboneDMAReader(LiteXModule):
 
     For every address written to the sink, one word will be produced on the source.
 
+    With rows == 0 a linear range of length bytes at base is read. Otherwise rows of row_length
+    bytes, row_stride bytes apart, are read as one packet or, with row_packets, one packet per row.
+
+    The transfer configuration (base, length, rows, row_*, srcdst_port, dst_ip) is held in shadow
+    registers: it is loaded when the DMA is enabled, and while running a write to commit applies it
+    at the next packet boundary, where the transfer restarts from the new configuration (with
+    row_packets that is the end of the current row). A commit after a transfer is done starts a
+    new one.
+
+    Disabling stops at the next packet boundary: the packet being read is always completed.
+
+    done is set once all words of a transfer are read, busy until they were all handed to the
+    UdpCore(s).
+
     Parameters
     ----------
     bus : bus
-        Wishbone bus of the SoC to read from.
+        Wishbone bus of the SoC to read from (one read per 2 sys cycles), unused with dram_port.
+
+    udp_sink : Endpoint or list of Endpoint
+        Sink of the UdpCore, or of one UdpCore per link. With several links packets are striped
+        round-robin (UdpStriper) into a BRAM FIFO per link (link_fifo_depth words), so each core
+        drains at its own line rate; link n sends to dst_ip(n+1) (dst_ip for link 0).
+
+    dram_port : LiteDRAMNativePort
+        Read through a native SDRAM port instead of the bus, pipelined (one word per sys cycle,
+        read_depth reads in flight). Bypasses the L2 cache, the CPU has to flush it after writing
+        the data. Addresses are bus addresses, dram_base is the bus address of the SDRAM.
+
+    with_packer : bool
+        Add a UdpSamplePacker (CSR controlled sample packing/decimation) in front of the FIFO.
+
+    prefetch_depth : int
+        Depth (in words) of a BRAM prefetch buffer in front of the FIFO, 0 to disable. SDRAM reads
+        start when its level drops below low_watermark and stop at high_watermark; with
+        hold_packet a packet is only sent once it is completely buffered (or the buffer reached
+        high_watermark).
+
+    with_remote : bool
+        Allow a UdpCommandDecoder to start/stop transfers through the remote_* signals.
 
     Attributes
     ----------
@@ -40,91 +86,388 @@ class UdpWishboneDMAReader(LiteXModule):
     source : Record("data")
         Source for MMAP word results from reading.
     """
-    def __init__(self, bus, udp_sink, endianness="little", fifo_depth=16):
-        assert isinstance(bus, wishbone.Interface)
+    def __init__(self, bus, udp_sink, endianness="little", fifo_depth=16, with_packer=False, prefetch_depth=0, with_remote=False,
+        dram_port=None, dram_base=0, read_depth=32, link_fifo_depth=512):
+        udp_sinks = udp_sink if isinstance(udp_sink, (list, tuple)) else [udp_sink]
+        if dram_port is None:
+            assert isinstance(bus, wishbone.Interface)
+            data_width, adr_width = bus.data_width, bus.adr_width
+        else:
+            data_width, adr_width = dram_port.data_width, dram_port.address_width
         self.bus            = bus
-        self.sink           = sink          = stream.Endpoint([("address", bus.adr_width, ("last", 1))])
+        self.data_width     = data_width
+        self.adr_width      = adr_width
+        self.adr_offset     = dram_base//(data_width//8) if dram_port is not None else 0
+        self.sink           = sink          = stream.Endpoint([("address", adr_width, ("last", 1))])
 
-        self.add_csr()
+        self.add_csr(write_from_dev=with_remote, links=len(udp_sinks))
+        if with_remote:
+            self.add_remote()
 
         # # #
 
         # FIFO..
         # TODO eth_50 can be any frequency as long as 4*cyc>125Mhz; CDC may not be needed
         #
-        self.fifo = fifo = ClockDomainsRenamer({"write": "sys", "read": "eth_50"})(stream.AsyncFIFO([("data", bus.data_width)], depth=fifo_depth))
+        # UDP params travel through the FIFO with every word, so the header of a packet always
+        # matches the configuration it was read with (no CDC on the params).
+        fifo_layout     = stream.EndpointDescription([("data", data_width)], udp_sinks[0].description.param_layout)
+
+        def udp_params(param):
+            return [
+                param.src_port.eq(self.srcdst_port[ 0:16]),
+                param.dst_port.eq(self.srcdst_port[16:32]),
+                param.ip_address.eq(self.dst_ip),
+                param.length.eq(self.packet_length),
+            ]
+
+        # Reads -> (Packer) -> (Prefetch) -> FIFO.
+        reader = stream.Endpoint(fifo_layout)
+        fetch  = Signal(reset=1)
+        self.rd_idle = Signal() # No read waiting for its ack, fetch may change.
+        self.reading = Signal() # Words of an issued packet still to come.
+        if dram_port is None:
+            self.comb += [
+                bus.stb.eq(sink.valid & reader.ready & fetch),
+                bus.cyc.eq(sink.valid & reader.ready & fetch),
+                bus.we.eq(0),
+                bus.sel.eq(2**(bus.data_width//8)-1),
+                bus.adr.eq(sink.address),
+                self.rd_idle.eq(~bus.stb | bus.ack),
+                self.reading.eq(self.pkt_open),
+
+                reader.last.eq(sink.last),
+                reader.data.eq(bus.dat_r),
+                *udp_params(reader.param),
+                If(bus.stb & bus.ack,
+                    sink.ready.eq(1),
+                    reader.valid.eq(1),
+                ),
+            ]
+        else:
+            # Reads are issued ahead of the data, the params of a packet wait in read_params
+            # from its first address to its last word.
+            self.dram_reader = dram_reader = LiteDRAMDMAReader(dram_port, fifo_depth=read_depth, fifo_buffered=True)
+            self.read_params = read_params = stream.SyncFIFO(fifo_layout.param_layout, read_depth)
+            first = Signal(reset=1)
+            issue = Signal()
+            self.comb += [
+                issue.eq(sink.valid & fetch & (read_params.sink.ready | ~first)),
+                dram_reader.sink.valid.eq(issue),
+                dram_reader.sink.address.eq(sink.address),
+                dram_reader.sink.last.eq(sink.last),
+                sink.ready.eq(issue & dram_reader.sink.ready),
+                read_params.sink.valid.eq(issue & dram_reader.sink.ready & first),
+                *udp_params(read_params.sink),
+                self.rd_idle.eq(1),
+                self.reading.eq(self.pkt_open | read_params.source.valid),
+
+                reader.valid.eq(dram_reader.source.valid),
+                reader.last.eq(dram_reader.source.last),
+                reader.data.eq(dram_reader.source.data),
+                reader.param.eq(read_params.source.payload),
+                dram_reader.source.ready.eq(reader.ready),
+                read_params.source.ready.eq(reader.valid & reader.ready & reader.last),
+            ]
+            self.sync += If(sink.valid & sink.ready,
+                first.eq(sink.last)
+            )
+
+        if with_packer:
+            self.packer = UdpSamplePacker(fifo_layout)
+            self.comb += reader.connect(self.packer.sink)
+            reader = self.packer.source
+
+        if prefetch_depth:
+            self.add_prefetch(reader, fetch, prefetch_depth)
+            reader = self.prefetch_source
+        else:
+            self.comb += fetch.eq(1)
+
+        # FIFO -> Output. With several links the striper hands whole packets to a FIFO per link.
+        if len(udp_sinks) == 1:
+            self.fifo = fifo = ClockDomainsRenamer({"write": "sys", "read": "eth_50"})(stream.AsyncFIFO(fifo_layout, depth=fifo_depth))
+            self.comb += fifo.source.connect(udp_sinks[0])
+            tx = fifo.sink
+        else:
+            link_fifos = [ClockDomainsRenamer({"write": "sys", "read": "eth_50"})(
+                UdpPacketFIFO(fifo_layout, depth=link_fifo_depth, cdc=True)) for _ in udp_sinks]
+            self.link_fifos  = link_fifos
+            self.submodules += link_fifos
+            self.striper = striper = UdpStriper([link_fifo.sink for link_fifo in link_fifos], ip_addresses=self.dst_ips)
+            for link_fifo, link_sink in zip(link_fifos, udp_sinks):
+                self.comb += link_fifo.source.connect(link_sink)
+            tx = striper.sink
+
+        self.comb += [
+            reader.connect(tx, omit={"data"}),
+            tx.data.eq(format_bytes(reader.data, endianness)),
+        ]
+
+        # Busy while words are still on their way to the UdpCore(s). Packets entering the FIFO are
+        # counted in sys, packets leaving it in eth_50.
+        queued = Signal(16)
+        sent   = Signal(16)
+        self.sent_sync = sent_sync = BusSynchronizer(16, "eth_50", "sys")
+        self.sync += If(tx.valid & tx.ready & tx.last, queued.eq(queued + 1))
+        self.sync.eth_50 += sent.eq(sent + reduce(add, [s.valid & s.ready & s.last for s in udp_sinks]))
+        buffered = [queued != sent_sync.o, self.reading]
+        if with_packer:
+            buffered.append(self.packer.busy)
+        if prefetch_depth:
+            buffered.append(self.prefetch.level != 0)
+        self.comb += [
+            sent_sync.i.eq(sent),
+            self._busy.status.eq(reduce(or_, buffered)),
+        ]
+
+    def add_prefetch(self, reader, fetch, depth, params_depth=16):
+        self._low_watermark     = CSRStorage(bits_for(depth), reset=depth//4)
+        self._high_watermark    = CSRStorage(bits_for(depth), reset=depth - depth//4)
+        self._hold_packet       = CSRStorage(reset=1)
+        self._prefetch_level    = CSRStatus(bits_for(depth))
+
+        # # #
+
+        # Words are buffered in BRAM, the UDP params only once per packet next to them.
+        self.prefetch        = prefetch = stream.SyncFIFO([("data", len(reader.data))], depth=depth, buffered=True)
+        self.prefetch_params = params   = stream.SyncFIFO(reader.description.param_layout, depth=params_depth)
+        first = Signal(reset=1)
+        self.comb += [
+            prefetch.sink.valid.eq(reader.valid & (params.sink.ready | ~first)),
+            prefetch.sink.last.eq(reader.last),
+            prefetch.sink.data.eq(reader.data),
+            params.sink.valid.eq(reader.valid & first & prefetch.sink.ready),
+            params.sink.payload.eq(reader.param),
+            reader.ready.eq(prefetch.sink.ready & (params.sink.ready | ~first)),
+            self._prefetch_level.status.eq(prefetch.level),
+        ]
 
+        # Complete packets in the buffer.
+        packets = Signal(max=depth + 1)
+        sending = Signal()
+        pkt_in  = Signal()
+        pkt_out = Signal()
 
-        # Reads -> FIFO.
+        self.prefetch_source = source = stream.Endpoint(reader.description)
+        gate = Signal()
         self.comb += [
-            bus.stb.eq(sink.valid & fifo.sink.ready),
-            bus.cyc.eq(sink.valid & fifo.sink.ready),
-            bus.we.eq(0),
-            bus.sel.eq(2**(bus.data_width//8)-1),
-            bus.adr.eq(sink.address),
-
-            fifo.sink.last.eq(sink.last),
-            fifo.sink.data.eq(format_bytes(bus.dat_r, endianness)),
-            If(bus.stb & bus.ack,
-                sink.ready.eq(1),
-                fifo.sink.valid.eq(1),
+            gate.eq(~self._hold_packet.storage | sending | (packets != 0) |
+                (prefetch.level >= self._high_watermark.storage)),
+            source.valid.eq(prefetch.source.valid & params.source.valid & gate),
+            source.last.eq(prefetch.source.last),
+            source.data.eq(prefetch.source.data),
+            source.param.eq(params.source.payload),
+            prefetch.source.ready.eq(source.valid & source.ready),
+            params.source.ready.eq(source.valid & source.ready & source.last),
+            pkt_in.eq(reader.valid & reader.ready & reader.last),
+            pkt_out.eq(source.valid & source.ready & source.last),
+        ]
+
+        # Disabling completes the packet being read, so everything buffered still drains.
+        self.sync += [
+            If(reader.valid & reader.ready,
+                first.eq(reader.last)
+            ),
+            If(pkt_in & ~pkt_out,
+                packets.eq(packets + 1)
+            ).Elif(~pkt_in & pkt_out,
+                packets.eq(packets - 1)
+            ),
+            If(source.valid & source.ready,
+                sending.eq(~source.last)
             ),
+            # Watermarks, only updated between bus transactions.
+            If(self.rd_idle,
+                If(prefetch.level >= self._high_watermark.storage,
+                    fetch.eq(0)
+                ).Elif((prefetch.level < self._low_watermark.storage) |
+                    (self._hold_packet.storage & ~gate),
+                    fetch.eq(1)
+                )
+            )
         ]
 
-        # FIFO -> Output
+    def add_remote(self):
+        self.remote_start       = Signal()
+        self.remote_stop        = Signal()
+        self.remote_base        = Signal(32)
+        self.remote_length      = Signal(32)
+        self.remote_srcdst_port = Signal(32)
+        self.remote_dst_ip      = Signal(32)
+
+        # # #
+
+        # Start: linear transfer, through the shadow registers + commit.
+        for csr, value in [
+            (self._base,        self.remote_base),
+            (self._length,      self.remote_length),
+            (self._srcdst_port, self.remote_srcdst_port),
+            (self._dst_ip,      self.remote_dst_ip),
+            (self._rows,        0)]:
+            self.comb += [
+                csr.we.eq(self.remote_start),
+                csr.dat_w.eq(value),
+            ]
         self.comb += [
-            fifo.source.ready.eq(udp_sink.ready),
-            udp_sink.valid.eq(fifo.source.valid),
-            udp_sink.first.eq(fifo.source.first),
-            udp_sink.last.eq(fifo.source.last),
-            udp_sink.payload.data.eq(fifo.source.payload.data),
-            udp_sink.param.src_port.eq(self._srcdst_port.storage[ 0:15]),
-            udp_sink.param.dst_port.eq(self._srcdst_port.storage[16:31]),
-            udp_sink.param.ip_address.eq(self._dst_ip.storage),
-            udp_sink.param.length.eq(self._length.storage)
+            self._enable.we.eq(self.remote_start | self.remote_stop),
+            self._enable.dat_w.eq(self.remote_start),
+            self.commit.eq(self.remote_start),
         ]
 
-    def add_csr(self, default_base=0, default_length=0, default_enable=0, default_loop=0):
-        self._base          = CSRStorage(32, reset=default_base)
-        self._length        = CSRStorage(32, reset=default_length)
-        self._enable        = CSRStorage(reset=default_enable)
+    def add_csr(self, default_base=0, default_length=0, default_enable=0, default_loop=0, write_from_dev=False, links=1):
+        # Shadow registers, applied on commit (or when enabling).
+        self._base          = CSRStorage(32, reset=default_base,   write_from_dev=write_from_dev)
+        self._length        = CSRStorage(32, reset=default_length, write_from_dev=write_from_dev)
+        self._srcdst_port   = CSRStorage(32, write_from_dev=write_from_dev)
+        self._dst_ip        = CSRStorage(32, write_from_dev=write_from_dev)
+        self._rows          = CSRStorage(16, write_from_dev=write_from_dev)
+        self._row_length    = CSRStorage(32)
+        self._row_stride    = CSRStorage(32)
+        self._row_packets   = CSRStorage()
+        for n in range(2, links + 1):
+            setattr(self, f"_dst_ip{n}", CSRStorage(32, name=f"dst_ip{n}"))
+        self._commit        = CSR()
+        self._pending       = CSRStatus()
+
+        self._enable        = CSRStorage(reset=default_enable, write_from_dev=write_from_dev)
         self._done          = CSRStatus()
+        self._busy          = CSRStatus()
         self._loop          = CSRStorage(reset=default_loop)
         self._offset        = CSRStatus(32)
-        self._srcdst_port   = CSRStorage(32)
-        self._dst_ip        = CSRStorage(32)
-        
+        self._packets       = CSRStatus(32)
+
         # # #
 
-        shift   = log2_int(self.bus.data_width//8)
-        base    = Signal(self.bus.adr_width)
-        offset  = Signal(self.bus.adr_width)
-        length  = Signal(self.bus.adr_width)
-        self.comb += base.eq(self._base.storage[shift:])
-        self.comb += length.eq(self._length.storage[shift:])
+        # Active configuration.
+        self.base           = Signal(32, reset=default_base)
+        self.length         = Signal(32, reset=default_length)
+        self.srcdst_port    = Signal(32)
+        self.dst_ip         = Signal(32)
+        self.rows           = Signal(16)
+        self.row_length     = Signal(32)
+        self.row_stride     = Signal(32)
+        self.row_packets    = Signal()
+        self.dst_ips        = [self.dst_ip] + [Signal(32) for _ in range(links - 1)]
+
+        self.commit = Signal()
 
-        self.comb += self._offset.status.eq(offset)
+        pending = Signal()
+        load    = Signal()
+        self.comb += self._pending.status.eq(pending)
+        self.sync += [
+            If(load,
+                self.base.eq(self._base.storage),
+                self.length.eq(self._length.storage),
+                self.srcdst_port.eq(self._srcdst_port.storage),
+                self.dst_ip.eq(self._dst_ip.storage),
+                self.rows.eq(self._rows.storage),
+                self.row_length.eq(self._row_length.storage),
+                self.row_stride.eq(self._row_stride.storage),
+                self.row_packets.eq(self._row_packets.storage),
+                *[dst_ip.eq(getattr(self, f"_dst_ip{n}").storage) for n, dst_ip in enumerate(self.dst_ips[1:], 2)],
+                pending.eq(0)
+            ),
+            If(self._commit.re | self.commit,
+                pending.eq(1)
+            )
+        ]
+
+        # rows == 0: linear transfer of length bytes, else rows of row_length bytes, row_stride
+        # bytes apart, as one packet or (row_packets) one packet per row.
+        linear  = Signal()
+        self.packet_length = Signal(32)
+        self.comb += [
+            linear.eq(self.rows == 0),
+            If(linear,
+                self.packet_length.eq(self.length)
+            ).Elif(self.row_packets,
+                self.packet_length.eq(self.row_length)
+            ).Else(
+                self.packet_length.eq(self.row_length[:16]*self.rows)
+            )
+        ]
+
+        shift       = log2_int(self.data_width//8)
+        base        = Signal(self.adr_width)
+        offset      = Signal(self.adr_width)
+        row_offset  = Signal(self.adr_width)
+        row_length  = Signal(self.adr_width)
+        row_stride  = Signal(self.adr_width)
+        row         = Signal(16)
+        rows        = Signal(16)
+        row_last    = Signal()
+        xfer_last   = Signal()
+        self.comb += [
+            base.eq(self.base[shift:] - self.adr_offset),
+            row_length.eq(Mux(linear, self.length[shift:], self.row_length[shift:])),
+            row_stride.eq(self.row_stride[shift:]),
+            rows.eq(Mux(linear, 1, self.rows)),
+            row_last.eq(offset == (row_length - 1)),
+            xfer_last.eq(row_last & (row == (rows - 1))),
+        ]
+
+        self.comb += self._offset.status.eq(row_offset + offset)
+
+        packets = Signal(32)
+        self.comb += self._packets.status.eq(packets)
+
+        # Disabling takes effect at the end of the packet being read (also when re-enabled before).
+        self.pkt_open = Signal()
+        self.stopping = Signal() # Disabled, the packet being read still completes.
+        stop          = Signal()
+        self.comb += self.stopping.eq((~self._enable.storage | stop) & self.pkt_open)
+        self.sync += [
+            If(self.sink.valid & self.sink.ready,
+                self.pkt_open.eq(~self.sink.last)
+            ),
+            If(~self._enable.storage,
+                stop.eq(1)
+            ).Elif(~self.pkt_open,
+                stop.eq(0)
+            )
+        ]
 
         self.fsm = fsm = ResetInserter()(FSM(reset_state="IDLE"))
-        self.comb += fsm.reset.eq(~self._enable.storage)
+        self.comb += fsm.reset.eq((~self._enable.storage | stop) & ~self.pkt_open)
         fsm.act("IDLE",
+            load.eq(1),
             NextValue(offset, 0),
+            NextValue(row, 0),
+            NextValue(row_offset, 0),
             NextState("RUN"),
         )
         fsm.act("RUN",
             self.sink.valid.eq(1),
-            self.sink.last.eq(offset == (length - 1)),
-            self.sink.address.eq(base + offset),
+            self.sink.last.eq(Mux(self.row_packets, row_last, xfer_last)),
+            self.sink.address.eq(base + row_offset + offset),
             If(self.sink.ready,
                 NextValue(offset, offset + 1),
                 If(self.sink.last,
-                    If(self._loop.storage,
-                        NextValue(offset, 0)
-                    ).Else(
-                        NextState("DONE")
-                    )
+                    NextValue(packets, packets + 1)
+                ),
+                If(row_last,
+                    NextValue(offset, 0),
+                    NextValue(row, row + 1),
+                    NextValue(row_offset, row_offset + row_stride)
+                ),
+                If(xfer_last & ~self._loop.storage & ~pending,
+                    # End of the transfer, offset keeps pointing past its last word while done.
+                    NextValue(offset, offset + 1),
+                    NextValue(row_offset, row_offset),
+                    NextState("DONE")
+                ).Elif(xfer_last | (self.sink.last & pending),
+                    # Packet boundary: (re)start the transfer, with a committed configuration.
+                    load.eq(pending),
+                    NextValue(offset, 0),
+                    NextValue(row, 0),
+                    NextValue(row_offset, 0)
                 )
             )
         )
-        fsm.act("DONE", self._done.status.eq(1))
-
+        fsm.act("DONE",
+            self._done.status.eq(~stop),
+            If(pending,
+                NextState("IDLE")
+            )
+        )
@@ -0,0 +1,92 @@
+"""UDP echo (RX -> TX loopback)."""
+
+from migen import *
+from migen.genlib.cdc import MultiReg
+
+from litex.gen import *
+
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect import stream
+
+from modules.udp_core import udp_stream_descr
+
+# UdpEcho ------------------------------------------------------------------------------------------
+
+class UdpEcho(LiteXModule):
+    """Send received datagrams back to their sender.
+
+    IP and ports are swapped. With timestamp, the eth_50 cycle counter at the time of the echo is
+    prepended to the payload (length grows by 4 bytes). Datagrams are dropped while disabled.
+
+    sink/source are in the eth_50 domain, the CSRs in sys.
+
+    Attributes
+    ----------
+    sink : Endpoint(udp_stream_descr)
+        Received datagrams (UdpCore.source).
+
+    source : Endpoint(udp_stream_descr)
+        Echoed datagrams (to UdpCore.sink).
+    """
+    def __init__(self, default_enable=1):
+        self.sink   = sink   = stream.Endpoint(udp_stream_descr())
+        self.source = source = stream.Endpoint(udp_stream_descr())
+
+        self._enable    = CSRStorage(reset=default_enable)
+        self._timestamp = CSRStorage()
+
+        # # #
+
+        enable    = Signal()
+        timestamp = Signal()
+        self.specials += [
+            MultiReg(self._enable.storage,    enable,    "eth_50"),
+            MultiReg(self._timestamp.storage, timestamp, "eth_50"),
+        ]
+
+        counter = Signal(32)
+        self.sync.eth_50 += counter.eq(counter + 1)
+
+        # Params of the echo, the timestamp mode is fixed per datagram.
+        with_ts = Signal()
+        swap = [
+            source.ip_address.eq(sink.ip_address),
+            source.src_port.eq(sink.dst_port),
+            source.dst_port.eq(sink.src_port),
+            source.length.eq(sink.length + Mux(with_ts, 4, 0)),
+        ]
+
+        self.fsm = fsm = ClockDomainsRenamer("eth_50")(FSM(reset_state="IDLE"))
+        fsm.act("IDLE",
+            NextValue(with_ts, timestamp),
+            If(sink.valid,
+                If(~enable,
+                    NextState("DROP")
+                ).Elif(timestamp,
+                    NextState("TIMESTAMP")
+                ).Else(
+                    NextState("ECHO")
+                )
+            )
+        )
+        fsm.act("DROP",
+            sink.ready.eq(1),
+            If(sink.valid & sink.last,
+                NextState("IDLE")
+            )
+        )
+        fsm.act("TIMESTAMP",
+            source.valid.eq(1),
+            source.data.eq(counter),
+            *swap,
+            If(source.ready,
+                NextState("ECHO")
+            )
+        )
+        fsm.act("ECHO",
+            sink.connect(source, omit={"ip_address", "src_port", "dst_port", "length"}),
+            *swap,
+            If(sink.valid & sink.ready & sink.last,
+                NextState("IDLE")
+            )
+        )
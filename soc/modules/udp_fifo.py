@@ -0,0 +1,75 @@
+"""UDP packet FIFO."""
+
+from migen import *
+
+from litex.gen import *
+
+from litex.soc.interconnect import stream
+
+# UdpPacketFIFO ------------------------------------------------------------------------------------
+
+class UdpPacketFIFO(LiteXModule):
+    """FIFO for UDP packets that stores the params once per packet.
+
+    Words go to a data FIFO (BRAM for larger depths), the params of a packet are written to a
+    small param FIFO with its first word and released with its last one.
+
+    Parameters
+    ----------
+    description : EndpointDescription
+        Layout of the stream (data + UDP params).
+
+    depth : int
+        Depth of the data FIFO in words.
+
+    params_depth : int
+        Number of packets the FIFO can hold.
+
+    cdc : bool
+        Cross from the "write" to the "read" clock domain (as stream.AsyncFIFO).
+
+    Attributes
+    ----------
+    sink : Endpoint(description)
+
+    source : Endpoint(description)
+
+    level : Signal
+        Words in the data FIFO (not available with cdc).
+    """
+    def __init__(self, description, depth, params_depth=16, buffered=False, cdc=False):
+        self.sink   = sink   = stream.Endpoint(description)
+        self.source = source = stream.Endpoint(description)
+
+        # # #
+
+        data_layout = [("data", len(sink.data))]
+        if cdc:
+            self.data   = data   = stream.AsyncFIFO(data_layout, depth, buffered)
+            self.params = params = stream.AsyncFIFO(description.param_layout, max(params_depth, 4))
+            sync = self.sync.write
+        else:
+            self.data   = data   = stream.SyncFIFO(data_layout, depth, buffered)
+            self.params = params = stream.SyncFIFO(description.param_layout, params_depth)
+            self.level  = data.level
+            sync = self.sync
+
+        first = Signal(reset=1)
+        self.comb += [
+            data.sink.valid.eq(sink.valid & (params.sink.ready | ~first)),
+            data.sink.last.eq(sink.last),
+            data.sink.data.eq(sink.data),
+            params.sink.valid.eq(sink.valid & first & data.sink.ready),
+            params.sink.payload.eq(sink.param),
+            sink.ready.eq(data.sink.ready & (params.sink.ready | ~first)),
+
+            source.valid.eq(data.source.valid & params.source.valid),
+            source.last.eq(data.source.last),
+            source.data.eq(data.source.data),
+            source.param.eq(params.source.payload),
+            data.source.ready.eq(source.valid & source.ready),
+            params.source.ready.eq(source.valid & source.ready & source.last),
+        ]
+        sync += If(sink.valid & sink.ready,
+            first.eq(sink.last)
+        )
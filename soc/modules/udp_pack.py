@@ -0,0 +1,195 @@
+"""UDP sample packing and decimation."""
+
+from functools import reduce
+from operator import add
+
+from migen import *
+
+from litex.gen import *
+
+from litex.soc.interconnect.csr import *
+from litex.soc.interconnect import stream
+
+# UdpSamplePacker ----------------------------------------------------------------------------------
+
+class UdpSamplePacker(LiteXModule):
+    """Pack N-bit samples densely, with channel selection and decimation.
+
+    Every input word carries one sample in its low `width` bits (1..32, other values of the width
+    CSR are clamped to that range). Words are interleaved over
+    2**channels channels; of every 2**decimation frames only the first is kept and of that frame
+    only the channels set in channel_mask. Kept samples are packed LSB first into the output
+    words, the last word of a packet is zero padded. The UDP length of every packet is rewritten
+    to the packed size.
+
+    The configuration must only be changed while the DMA is disabled.
+
+    Parameters
+    ----------
+    description : EndpointDescription
+        Layout of the stream (data + UDP params).
+
+    Attributes
+    ----------
+    sink : Endpoint(description)
+        Unpacked words, in memory byte order.
+
+    source : Endpoint(description)
+        Packed words, in memory byte order.
+
+    reset : Signal
+        Abort the current packet.
+
+    busy : Signal
+        Output of a finished packet still pending (do not reset).
+    """
+    def __init__(self, description, max_channels_log2=3):
+        self.sink   = sink   = stream.Endpoint(description)
+        self.source = source = stream.Endpoint(description)
+        self.reset  = Signal()
+        self.busy   = Signal()
+
+        data_width = len(sink.data)
+        assert data_width == 32
+
+        self._width         = CSRStorage(6, reset=data_width)
+        self._channels      = CSRStorage(bits_for(max_channels_log2))
+        self._decimation    = CSRStorage(4)
+        self._channel_mask  = CSRStorage(2**max_channels_log2, reset=2**(2**max_channels_log2)-1)
+
+        # # #
+
+        width       = Signal(6)
+        chan_log2   = self._channels.storage
+        dec_log2    = self._decimation.storage
+        chan_mask   = Signal(2**max_channels_log2)
+        self.comb += [
+            If(self._width.storage == 0,
+                width.eq(1)
+            ).Elif(self._width.storage > data_width,
+                width.eq(data_width)
+            ).Else(
+                width.eq(self._width.storage)
+            ),
+            chan_mask.eq(self._channel_mask.storage & ((1 << (1 << chan_log2)) - 1)),
+        ]
+
+        # Packed length, from the params of the incoming packet.
+        n_words     = Signal(len(sink.length) - 2)
+        shift       = Signal(max=max_channels_log2 + 2**len(dec_log2))
+        windows     = Signal(len(n_words))
+        rem         = Signal(len(n_words))
+        partial     = Signal(max=2**max_channels_log2 + 1)
+        kept        = Signal(len(sink.length))
+        words       = Signal(len(n_words))
+        self.comb += [
+            n_words.eq(sink.length[2:]),
+            shift.eq(chan_log2 + dec_log2),
+            windows.eq(n_words >> shift),
+            rem.eq(n_words & ((1 << shift) - 1)),
+            # Samples of the trailing incomplete window, only its first frame is kept.
+            partial.eq(reduce(add, [chan_mask[i] & (rem > i) for i in range(len(chan_mask))])),
+            kept.eq(windows*reduce(add, [chan_mask[i] for i in range(len(chan_mask))]) + partial),
+            words.eq((kept*width + data_width - 1) >> log2_int(data_width)),
+        ]
+
+        # Sample selection.
+        idx         = Signal(len(n_words))
+        chan        = Signal(max_channels_log2)
+        frame       = Signal(len(n_words))
+        keep        = Signal()
+        self.comb += [
+            chan.eq(idx & ((1 << chan_log2) - 1)),
+            frame.eq(idx >> chan_log2),
+            keep.eq((chan_mask >> chan)[0] & ((frame & ((1 << dec_log2) - 1)) == 0)),
+        ]
+
+        # Packing.
+        first       = Signal(reset=1)
+        acc         = Signal(2*data_width)
+        fill        = Signal(max=2*data_width)
+        count       = Signal(len(n_words))
+        out_words   = Signal(len(n_words))
+        sample_mask = Signal(data_width)
+        acc_next    = Signal(2*data_width)
+        fill_next   = Signal(max=2*data_width)
+        last_word   = Signal()
+        self.comb += [
+            sample_mask.eq((1 << width) - 1),
+            acc_next.eq(acc | ((sink.data & sample_mask) << fill)),
+            fill_next.eq(fill + width),
+            last_word.eq(count == (Mux(first, words, out_words) - 1)),
+        ]
+
+        # Output register, params are latched with the first word of a packet.
+        param       = Record(description.param_layout)
+        emit        = Signal()
+        emit_data   = Signal(data_width)
+        emit_last   = Signal()
+        can_emit    = Signal()
+        self.comb += [
+            can_emit.eq(~source.valid | source.ready),
+            source.param.eq(param),
+            source.length.eq(out_words << 2),
+        ]
+        self.sync += [
+            If(sink.valid & sink.ready & first,
+                param.eq(sink.param)
+            ),
+            If(source.ready,
+                source.valid.eq(0)
+            ),
+            If(emit,
+                source.valid.eq(1),
+                source.data.eq(emit_data),
+                source.last.eq(emit_last),
+            ),
+            If(self.reset,
+                source.valid.eq(0)
+            )
+        ]
+
+        self.fsm = fsm = ResetInserter()(FSM(reset_state="PACK"))
+        self.comb += [
+            fsm.reset.eq(self.reset),
+            self.busy.eq(source.valid | fsm.ongoing("FLUSH")),
+        ]
+        fsm.act("PACK",
+            sink.ready.eq(can_emit),
+            If(sink.valid & sink.ready,
+                NextValue(first, 0),
+                If(first,
+                    NextValue(out_words, words)
+                ),
+                NextValue(idx, idx + 1),
+                If(keep,
+                    If(fill_next >= data_width,
+                        emit.eq(1),
+                        emit_data.eq(acc_next[:data_width]),
+                        emit_last.eq(last_word),
+                        NextValue(count, count + 1),
+                        NextValue(acc,  acc_next[data_width:]),
+                        NextValue(fill, fill_next - data_width)
+                    ).Else(
+                        NextValue(acc,  acc_next),
+                        NextValue(fill, fill_next)
+                    )
+                ),
+                If(sink.last,
+                    NextState("FLUSH")
+                )
+            )
+        )
+        fsm.act("FLUSH",
+            If((fill == 0) | can_emit,
+                emit.eq(fill != 0),
+                emit_data.eq(acc[:data_width]),
+                emit_last.eq(1),
+                NextValue(first, 1),
+                NextValue(idx,   0),
+                NextValue(acc,   0),
+                NextValue(fill,  0),
+                NextValue(count, 0),
+                NextState("PACK")
+            )
+        )
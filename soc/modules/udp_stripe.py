@@ -0,0 +1,76 @@
+"""UDP link striping."""
+
+from migen import *
+
+from litex.gen import *
+
+from litex.soc.interconnect import stream
+
+# UdpStriper ---------------------------------------------------------------------------------------
+
+class UdpStriper(LiteXModule):
+    """Distribute UDP packets round-robin over several UdpCores.
+
+    A 32-bit sequence number is prepended to every packet (length grows by 4 bytes) so the
+    receiver can restore the packet order across the links.
+
+    Packets are handed out one at a time, so the striper must run faster than a single link: in
+    the SoC it sits in sys in front of a FIFO per link (see UdpWishboneDMAReader), which each
+    UdpCore drains at its own line rate.
+
+    Parameters
+    ----------
+    udp_sinks : list of Endpoint
+        Sinks of the UdpCores (or their FIFOs) to stripe over.
+
+    ip_addresses : list of Signal
+        Destination IP per link, overrides ip_address of the packets.
+
+    Attributes
+    ----------
+    sink : Endpoint(udp_stream_descr)
+        Packets to be striped.
+    """
+    def __init__(self, udp_sinks, ip_addresses=None):
+        self.sink   = sink   = stream.Endpoint(udp_sinks[0].description)
+        self.source = source = stream.Endpoint(udp_sinks[0].description)
+
+        # # #
+
+        seq = Signal(32)
+        sel = Signal(max=max(len(udp_sinks), 2))
+
+        # Output -> selected UdpCore.
+        self.comb += Case(sel, {i: source.connect(udp_sink) for i, udp_sink in enumerate(udp_sinks)})
+
+        ip_address = Signal(32)
+        if ip_addresses is None:
+            self.comb += ip_address.eq(sink.ip_address)
+        else:
+            self.comb += Case(sel, {i: ip_address.eq(ip) for i, ip in enumerate(ip_addresses)})
+
+        self.fsm = fsm = FSM(reset_state="SEQ")
+        fsm.act("SEQ",
+            source.valid.eq(sink.valid),
+            source.data.eq(seq),
+            source.param.eq(sink.param),
+            source.ip_address.eq(ip_address),
+            source.length.eq(sink.length + 4),
+            If(source.valid & source.ready,
+                NextState("DATA")
+            )
+        )
+        fsm.act("DATA",
+            sink.connect(source, omit={"ip_address", "length"}),
+            source.ip_address.eq(ip_address),
+            source.length.eq(sink.length + 4),
+            If(sink.valid & sink.ready & sink.last,
+                NextValue(seq, seq + 1),
+                If(sel == (len(udp_sinks) - 1),
+                    NextValue(sel, 0)
+                ).Else(
+                    NextValue(sel, sel + 1)
+                ),
+                NextState("SEQ")
+            )
+        )
@@ -26,8 +26,12 @@ from litedram.modules import M12L16161A, M12L64322A
 from litedram.phy import GENSDRPHY, HalfRateGENSDRPHY
 
 from litex.soc.interconnect import wishbone
+from litex.soc.interconnect import stream
+from litex.soc.interconnect.packet import Arbiter
 
-from modules.udp_core import UdpCore
+from modules.udp_core import UdpCore, udp_stream_descr
+from modules.udp_cmd import UdpCommandDecoder
+from modules.udp_echo import UdpEcho
 from modules.udp_dma import UdpWishboneDMAReader
 
 from litescope import LiteScopeAnalyzer
@@ -104,6 +108,14 @@ class BaseSoC(SoCCore):
         eth_phy          = 0,
         eth_subn         = "255.255.255.0",
         eth_mac          = "AE:00:00:00:00:00",
+        eth_dual_phy     = False,
+        eth_ip2          = "192.168.2.51",
+        eth_mac2         = "AE:00:00:00:00:01",
+        with_udp_packer  = False,
+        with_udp_cmd     = False,
+        udp_cmd_port     = 5000,
+        with_udp_echo    = False,
+        udp_prefetch     = 0,
         with_led_chaser  = True,
         use_internal_osc = False,
         sdram_rate       = "1:1",
@@ -164,11 +176,6 @@ class BaseSoC(SoCCore):
 
         # Ethernet / Etherbone ---------------------------------------------------------------------
         if with_ethernet:
-            self.udp_rd_if = wishbone.Interface(
-                data_width=self.bus.data_width,
-                adr_width=self.bus.address_width
-            )
-
             self.upd_core = UdpCore(
                 platform   = self.platform,
                 eth_phy    = eth_phy,
@@ -179,8 +186,68 @@ class BaseSoC(SoCCore):
                 mac        = eth_mac
             )
 
-            self.bus.add_master(name="udp_rd", master=self.udp_rd_if)
-            self.wb_udp_tx_dma = UdpWishboneDMAReader(bus=self.udp_rd_if, udp_sink=self.upd_core.sink)
+            udp_tx = self.upd_core.sink
+
+            # Command replies/echoes share the TX path of the first PHY with the DMA.
+            if with_udp_cmd or with_udp_echo:
+                udp_tx = stream.Endpoint(udp_stream_descr())
+            udp_sink = udp_tx
+
+            # Dual PHY: stripe packets round-robin over both ports, each with its own FIFO and
+            # destination IP. The DMA reads through a native SDRAM port (pipelined, bypasses the
+            # L2 cache) to feed both links; a Wishbone master only makes ~960 Mbit/s.
+            udp_rd_if = None
+            dram_port = None
+            if eth_dual_phy:
+                assert not self.integrated_main_ram_size, "Dual PHY needs the SDRAM."
+                self.upd_core1 = UdpCore(
+                    platform   = self.platform,
+                    eth_phy    = 1 - eth_phy,
+                    cd50       = self.crg.cd_eth_50,
+                    cd125      = self.crg.cd_eth_125,
+                    ip         = eth_ip2,
+                    subnetmask = eth_subn,
+                    mac        = eth_mac2
+                )
+                udp_sink  = [udp_tx, self.upd_core1.sink]
+                dram_port = self.sdram.crossbar.get_port(mode="read", data_width=32)
+            else:
+                self.udp_rd_if = udp_rd_if = wishbone.Interface(
+                    data_width=self.bus.data_width,
+                    adr_width=self.bus.address_width
+                )
+                self.bus.add_master(name="udp_rd", master=self.udp_rd_if)
+
+            self.wb_udp_tx_dma = UdpWishboneDMAReader(bus=udp_rd_if, udp_sink=udp_sink,
+                dram_port      = dram_port,
+                dram_base      = self.mem_map["main_ram"],
+                with_packer    = with_udp_packer,
+                prefetch_depth = udp_prefetch,
+                with_remote    = with_udp_cmd
+            )
+
+            # UDP command channel / echo.
+            udp_tx_masters = [udp_tx]
+            if with_udp_cmd:
+                self.udp_cmd = UdpCommandDecoder(dma=self.wb_udp_tx_dma, port=udp_cmd_port)
+                udp_tx_masters.append(self.udp_cmd.source)
+            if with_udp_echo:
+                self.udp_echo = UdpEcho()
+                udp_tx_masters.append(self.udp_echo.source)
+
+            if with_udp_cmd and with_udp_echo:
+                self.comb += If(self.upd_core.source.dst_port == udp_cmd_port,
+                    self.upd_core.source.connect(self.udp_cmd.sink)
+                ).Else(
+                    self.upd_core.source.connect(self.udp_echo.sink)
+                )
+            elif with_udp_cmd:
+                self.comb += self.upd_core.source.connect(self.udp_cmd.sink)
+            elif with_udp_echo:
+                self.comb += self.upd_core.source.connect(self.udp_echo.sink)
+
+            if len(udp_tx_masters) > 1:
+                self.udp_tx_arbiter = ClockDomainsRenamer("eth_50")(Arbiter(udp_tx_masters, self.upd_core.sink))
 
         # Leds -------------------------------------------------------------------------------------
         # Disable leds when serial is used.
@@ -256,6 +323,14 @@ def main():
     parser.add_target_argument("--eth-subnetmask",    default="255.255.255.0",      help="Ethernet/Etherbone Subnetmask.")
     parser.add_target_argument("--eth-mac",           default="AE:00:00:00:00:00",  help="Ethernet/Etherbone MAC.")
     parser.add_target_argument("--eth-phy",           default=0, type=int,          help="Ethernet PHY (0 or 1).")
+    parser.add_target_argument("--eth-dual-phy",      action="store_true",          help="Stripe UDP packets over both Ethernet PHYs (DMA reads through a native SDRAM port).")
+    parser.add_target_argument("--eth-ip2",           default="192.168.2.51",       help="Ethernet IP address of the second PHY (own subnet).")
+    parser.add_target_argument("--eth-mac2",          default="AE:00:00:00:00:01",  help="Ethernet MAC of the second PHY.")
+    parser.add_target_argument("--with-udp-packer",   action="store_true",          help="Add sample packing/decimation to the UDP DMA.")
+    parser.add_target_argument("--with-udp-cmd",      action="store_true",          help="Add the UDP command channel for DMA control.")
+    parser.add_target_argument("--udp-cmd-port",      default=5000, type=int,       help="UDP command channel port.")
+    parser.add_target_argument("--with-udp-echo",     action="store_true",          help="Add the UDP echo (RX -> TX loopback).")
+    parser.add_target_argument("--udp-prefetch",      default=0, type=int,          help="UDP DMA BRAM prefetch buffer depth in words (e.g. 1024, 0 to disable).")
     parser.add_target_argument("--use-internal-osc",  action="store_true",          help="Use internal oscillator.")
     parser.add_target_argument("--sdram-rate",        default="1:1",                help="SDRAM Rate (1:1 Full Rate or 1:2 Half Rate).")
     parser.add_target_argument("--with-spi-flash",    action="store_true",          help="Add SPI flash support to the SoC")
@@ -269,6 +344,14 @@ def main():
         eth_subn         = args.eth_subnetmask,
         eth_mac          = args.eth_mac,
         eth_phy          = args.eth_phy,
+        eth_dual_phy     = args.eth_dual_phy,
+        eth_ip2          = args.eth_ip2,
+        eth_mac2         = args.eth_mac2,
+        with_udp_packer  = args.with_udp_packer,
+        udp_prefetch     = args.udp_prefetch,
+        with_udp_cmd     = args.with_udp_cmd,
+        udp_cmd_port     = args.udp_cmd_port,
+        with_udp_echo    = args.with_udp_echo,
         use_internal_osc = args.use_internal_osc,
         sdram_rate       = args.sdram_rate,
         with_spi_flash   = args.with_spi_flash,
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import argparse
+
+from migen import *
+
+from litex.gen import *
+
+from litex.build.generic_platform import *
+from litex.build.sim import SimPlatform
+from litex.build.sim.config import SimConfig
+
+from litex.soc.integration.common import get_mem_data
+from litex.soc.integration.soc_core import *
+from litex.soc.integration.builder import *
+
+from litex.soc.interconnect import wishbone
+
+from litex.tools.litex_sim import get_sdram_phy_settings
+
+from litedram.modules import M12L16161A
+from litedram.phy.model import SDRAMPHYModel
+
+from modules.udp_core import UdpCoreModel
+from modules.udp_dma import UdpWishboneDMAReader
+
+# IOs ----------------------------------------------------------------------------------------------
+
+_io = [
+    ("sys_clk",    0, Pins(1)),
+    ("sys_rst",    0, Pins(1)),
+    ("eth_50_clk", 0, Pins(1)),
+    ("serial", 0,
+        Subsignal("source_valid", Pins(1)),
+        Subsignal("source_ready", Pins(1)),
+        Subsignal("source_data",  Pins(8)),
+
+        Subsignal("sink_valid",   Pins(1)),
+        Subsignal("sink_ready",   Pins(1)),
+        Subsignal("sink_data",    Pins(8)),
+    ),
+]
+
+# Platform -----------------------------------------------------------------------------------------
+
+class Platform(SimPlatform):
+    def __init__(self):
+        SimPlatform.__init__(self, "SIM", _io)
+
+# CRG ----------------------------------------------------------------------------------------------
+
+class _CRG(LiteXModule):
+    def __init__(self, platform):
+        self.cd_sys    = ClockDomain()
+        self.cd_eth_50 = ClockDomain()
+
+        # # #
+
+        # eth_50 has its own clock, as on the board, so the DMA FIFO really crosses domains.
+        rst = platform.request("sys_rst")
+        self.comb += [
+            self.cd_sys.clk.eq(platform.request("sys_clk")),
+            self.cd_sys.rst.eq(rst),
+            self.cd_eth_50.clk.eq(platform.request("eth_50_clk")),
+            self.cd_eth_50.rst.eq(rst),
+        ]
+
+# SimSoC -------------------------------------------------------------------------------------------
+
+class SimSoC(SoCCore):
+    def __init__(self, sys_clk_freq=int(60e6), sdram_init=[],
+        with_udp_packer = False,
+        udp_prefetch    = 0,
+        **kwargs):
+        platform = Platform()
+
+        # CRG --------------------------------------------------------------------------------------
+        self.crg = _CRG(platform)
+
+        # SoCCore ----------------------------------------------------------------------------------
+        SoCCore.__init__(self, platform, sys_clk_freq, ident="Streamliner LiteX Simulation", **kwargs)
+
+        # SDR SDRAM --------------------------------------------------------------------------------
+        sdram_module = M12L16161A(sys_clk_freq, "1:1")
+        phy_settings = get_sdram_phy_settings(
+            memtype    = sdram_module.memtype,
+            data_width = 32,
+            clk_freq   = sys_clk_freq)
+        self.sdrphy = SDRAMPHYModel(
+            module     = sdram_module,
+            settings   = phy_settings,
+            clk_freq   = sys_clk_freq,
+            init       = sdram_init)
+        self.add_sdram("sdram",
+            phy                     = self.sdrphy,
+            module                  = sdram_module,
+            l2_cache_size           = kwargs.get("l2_size", 8192),
+            l2_cache_full_memory_we = False,
+        )
+        if sdram_init != []:
+            self.add_constant("ROM_BOOT_ADDRESS", self.bus.regions["main_ram"].origin)
+
+        # UDP DMA ----------------------------------------------------------------------------------
+        self.udp_rd_if = wishbone.Interface(
+            data_width=self.bus.data_width,
+            adr_width=self.bus.address_width
+        )
+
+        self.upd_core = UdpCoreModel()
+
+        self.bus.add_master(name="udp_rd", master=self.udp_rd_if)
+        self.wb_udp_tx_dma = UdpWishboneDMAReader(bus=self.udp_rd_if, udp_sink=self.upd_core.sink,
+            with_packer    = with_udp_packer,
+            prefetch_depth = udp_prefetch,
+        )
+
+# Build --------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamliner LiteX Simulation.")
+    parser.add_argument("--sys-clk-freq", default=60e6, type=float, help="System clock frequency (timebase of the firmware benchmark).")
+    parser.add_argument("--sdram-init",   default=None,            help="SDRAM init file (.bin or .json), e.g. firmware/dma_bench.bin.")
+    parser.add_argument("--trace",        action="store_true",     help="Enable Tracing.")
+    parser.add_argument("--with-udp-packer", action="store_true",  help="Add sample packing/decimation to the UDP DMA (as streamliner.py).")
+    parser.add_argument("--udp-prefetch", default=0, type=int,     help="UDP DMA BRAM prefetch buffer depth in words (as streamliner.py).")
+    builder_args(parser)
+    soc_core_args(parser)
+    args = parser.parse_args()
+
+    sys_clk_freq = int(args.sys_clk_freq)
+
+    soc_kwargs = soc_core_argdict(args)
+    soc_kwargs["uart_name"] = "sim"
+
+    sim_config = SimConfig()
+    sim_config.add_clocker("sys_clk",    freq_hz=sys_clk_freq)
+    sim_config.add_clocker("eth_50_clk", freq_hz=int(50e6))
+    sim_config.add_module("serial2console", "serial")
+
+    sdram_init = []
+    if args.sdram_init is not None:
+        sdram_init = get_mem_data(args.sdram_init, data_width=32, endianness="little", offset=0x40000000)
+
+    soc = SimSoC(sys_clk_freq=sys_clk_freq, sdram_init=sdram_init,
+        with_udp_packer = args.with_udp_packer,
+        udp_prefetch    = args.udp_prefetch,
+        **soc_kwargs)
+    builder = Builder(soc, **builder_argdict(args))
+    builder.build(sim_config=sim_config, trace=args.trace)
+
+if __name__ == "__main__":
+    main()
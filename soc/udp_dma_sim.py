@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+
+"""Simulate UdpWishboneDMAReader.
+
+A Wishbone memory model (or, for dual PHY, a native SDRAM port model) returns the word address as
+data, sinks with random ready collect the UDP packets. Checks linear and 2D transfers (addresses,
+UDP lengths, with and without row_packets), offset while done, commit at the next packet
+boundary without any packet mixing old and new params, disabling right after done with the
+prefetch buffer holding packets, and striping over two links.
+"""
+
+import argparse
+import random
+
+from migen import *
+
+from litex.soc.interconnect import stream
+from litex.soc.interconnect import wishbone
+
+from litedram.common import LiteDRAMNativePort
+
+from modules.udp_core import udp_stream_descr
+from modules.udp_dma import UdpWishboneDMAReader
+
+# Reference model ----------------------------------------------------------------------------------
+
+def transfer(base, length=0, rows=0, row_length=0, row_stride=0, row_packets=0, **params):
+    """Word addresses and UDP length of the packets of one transfer."""
+    if rows == 0:
+        return [(list(range(base//4, (base + length)//4)), length)]
+    packets = [list(range((base + r*row_stride)//4, (base + r*row_stride + row_length)//4)) for r in range(rows)]
+    if row_packets:
+        return [(words, row_length) for words in packets]
+    return [(sum(packets, []), rows*row_length)]
+
+def done_offset(length=0, rows=0, row_length=0, row_stride=0, **kwargs):
+    """offset (in words) once a transfer is done: past its last word."""
+    if rows == 0:
+        return length//4
+    return ((rows - 1)*row_stride + row_length)//4
+
+# Testbench ----------------------------------------------------------------------------------------
+
+class Testbench:
+    def __init__(self, links=1, prefetch_depth=0, ready=0.7):
+        self.udp_sinks = [stream.Endpoint(udp_stream_descr()) for _ in range(links)]
+        self.ready     = ready
+        self.received  = [[] for _ in range(links)]
+        if links == 1:
+            self.bus  = wishbone.Interface()
+            self.port = None
+            self.dut  = UdpWishboneDMAReader(self.bus, self.udp_sinks[0], prefetch_depth=prefetch_depth)
+        else:
+            self.bus  = None
+            self.port = LiteDRAMNativePort("read", address_width=24, data_width=32)
+            self.dut  = UdpWishboneDMAReader(None, self.udp_sinks, dram_port=self.port, prefetch_depth=prefetch_depth)
+
+    def configure(self, base, length=0, rows=0, row_length=0, row_stride=0, row_packets=0, src_port=0, dst_port=0, ip=0, ip2=0):
+        dut = self.dut
+        yield dut._base.storage.eq(base)
+        yield dut._length.storage.eq(length)
+        yield dut._rows.storage.eq(rows)
+        yield dut._row_length.storage.eq(row_length)
+        yield dut._row_stride.storage.eq(row_stride)
+        yield dut._row_packets.storage.eq(row_packets)
+        yield dut._srcdst_port.storage.eq((dst_port << 16) | src_port)
+        yield dut._dst_ip.storage.eq(ip)
+        if self.port is not None:
+            yield dut._dst_ip2.storage.eq(ip2)
+
+    def commit(self):
+        yield self.dut._commit.re.eq(1)
+        yield
+        yield self.dut._commit.re.eq(0)
+
+    def wait(self, status, value=1, timeout=100000):
+        for _ in range(timeout):
+            yield
+            if (yield status) == value:
+                return
+        raise TimeoutError(status)
+
+    @passive
+    def memory(self):
+        bus = self.bus
+        while True:
+            yield bus.ack.eq(0)
+            yield
+            if (yield bus.stb) and (yield bus.cyc) and not (yield bus.ack):
+                yield bus.dat_r.eq((yield bus.adr))
+                yield bus.ack.eq(1)
+                yield
+
+    @passive
+    def sdram(self, latency=6):
+        port  = self.port
+        reads = []
+        cycle = 0
+        while True:
+            yield port.cmd.ready.eq(random.random() > 0.2)
+            yield port.rdata.valid.eq(0)
+            if reads and reads[0][0] <= cycle:
+                yield port.rdata.valid.eq(1)
+                yield port.rdata.data.eq(reads[0][1])
+            yield
+            cycle += 1
+            if (yield port.rdata.valid) and (yield port.rdata.ready):
+                reads.pop(0)
+            if (yield port.cmd.valid) and (yield port.cmd.ready):
+                reads.append((cycle + latency, (yield port.cmd.addr)))
+
+    def sink(self, n):
+        @passive
+        def gen():
+            udp_sink = self.udp_sinks[n]
+            words    = []
+            while True:
+                yield udp_sink.ready.eq(random.random() < self.ready)
+                yield
+                if (yield udp_sink.valid) and (yield udp_sink.ready):
+                    # Memory byte order on the wire: reverse the bytes back.
+                    words.append(int.from_bytes((yield udp_sink.data).to_bytes(4, "big"), "little"))
+                    params = ((yield udp_sink.length), (yield udp_sink.src_port), (yield udp_sink.dst_port), (yield udp_sink.ip_address))
+                    if len(words) == 1:
+                        first = params
+                    assert params == first, f"link {n}: params changed within a packet"
+                    if (yield udp_sink.last):
+                        self.received[n].append((words, *params))
+                        words = []
+        return gen()
+
+    def run(self, ctrl):
+        sys = [ctrl, self.memory() if self.port is None else self.sdram()]
+        run_simulation(self.dut, {"sys": sys, "eth_50": [self.sink(n) for n in range(len(self.udp_sinks))]},
+            clocks={"sys": 10, "eth_50": 20})
+
+# Tests --------------------------------------------------------------------------------------------
+
+TRANSFERS = [
+    dict(base=0x1000, length=100),
+    dict(base=0x2000, rows=4, row_length=32, row_stride=64),
+    dict(base=0x3000, rows=5, row_length=24, row_stride=40, row_packets=1),
+]
+
+def test_transfers(prefetch_depth):
+    """Linear and 2D transfers, one after the other with enable: addresses, length, offset."""
+    tb = Testbench(prefetch_depth=prefetch_depth)
+    offsets = []
+
+    def ctrl():
+        for n, config in enumerate(TRANSFERS):
+            yield from tb.configure(**config, src_port=1000 + n, dst_port=2000 + n, ip=0xc0a80100 + n)
+            yield tb.dut._enable.storage.eq(1)
+            yield from tb.wait(tb.dut._done.status)
+            yield from tb.wait(tb.dut._busy.status, 0)
+            offsets.append((yield tb.dut._offset.status))
+            yield tb.dut._enable.storage.eq(0)
+            yield
+
+    tb.run(ctrl())
+    expected = []
+    for n, config in enumerate(TRANSFERS):
+        expected += [(words, length, 1000 + n, 2000 + n, 0xc0a80100 + n) for words, length in transfer(**config)]
+    assert tb.received[0] == expected, "transfers"
+    assert offsets == [done_offset(**config) for config in TRANSFERS], f"offset while done: {offsets}"
+
+def test_commit(prefetch_depth):
+    """Commit while looping: applied at the next packet boundary, no packet mixes old and new."""
+    tb = Testbench(prefetch_depth=prefetch_depth)
+    old = dict(base=0x1000, rows=4, row_length=40, row_stride=64, row_packets=1, src_port=1, dst_port=2, ip=0x0a000001)
+    new = dict(base=0x8000, rows=3, row_length=28, row_stride=32, row_packets=1, src_port=3, dst_port=4, ip=0x0a000002)
+    at_commit = []
+
+    def ctrl():
+        yield from tb.configure(**old)
+        yield tb.dut._loop.storage.eq(1)
+        yield tb.dut._enable.storage.eq(1)
+        for _ in range(random.randint(100, 200)):
+            yield
+        yield from tb.configure(**new)
+        at_commit.append((yield tb.dut._packets.status))
+        yield from tb.commit()
+        yield from tb.wait(tb.dut._pending.status, 0)
+        for _ in range(1000):
+            yield
+        yield tb.dut._enable.storage.eq(0)
+        yield from tb.wait(tb.dut._busy.status, 0)
+
+    tb.run(ctrl())
+    params  = lambda c: (c["src_port"], c["dst_port"], c["ip"])
+    old_pkts = [(words, length, *params(old)) for words, length in transfer(**old)]
+    new_pkts = [(words, length, *params(new)) for words, length in transfer(**new)]
+    received = tb.received[0]
+    first_new = next(i for i, pkt in enumerate(received) if pkt in new_pkts)
+    # The packet being read when committing still completes, the next one is the new row 0.
+    assert first_new in (at_commit[0], at_commit[0] + 1), f"commit applied late: {first_new} {at_commit}"
+    for i, pkt in enumerate(received):
+        cycle = old_pkts if i < first_new else new_pkts
+        assert pkt == cycle[i % len(cycle) if i < first_new else (i - first_new) % len(cycle)], f"packet {i}"
+
+def test_disable(prefetch_depth):
+    """Disable right after done (and mid-packet): the packets being buffered/read complete."""
+    tb = Testbench(prefetch_depth=prefetch_depth, ready=0.2)
+    first  = dict(base=0x1000, rows=4, row_length=128, row_stride=128, row_packets=1)
+    second = dict(base=0x4000, length=512)
+
+    def ctrl():
+        if prefetch_depth:
+            yield tb.dut._hold_packet.storage.eq(1)
+        yield from tb.configure(**first)
+        yield tb.dut._enable.storage.eq(1)
+        yield from tb.wait(tb.dut._done.status)
+        yield tb.dut._enable.storage.eq(0)
+        yield from tb.wait(tb.dut._busy.status, 0)
+        # Stop mid-packet, restart before the packet was read completely.
+        yield from tb.configure(**second)
+        yield tb.dut._enable.storage.eq(1)
+        for _ in range(20):
+            yield
+        yield tb.dut._enable.storage.eq(0)
+        for _ in range(10):
+            yield
+        yield tb.dut._enable.storage.eq(1)
+        yield from tb.wait(tb.dut._done.status)
+        yield tb.dut._enable.storage.eq(0)
+        yield from tb.wait(tb.dut._busy.status, 0)
+
+    tb.run(ctrl())
+    expected = [(words, length, 0, 0, 0) for words, length in transfer(**first) + 2*transfer(**second)]
+    assert tb.received[0] == expected, "disable"
+
+def test_links(prefetch_depth):
+    """Two links: sequence numbers, per-link IP, all packets once."""
+    tb = Testbench(links=2, prefetch_depth=prefetch_depth)
+    config = dict(base=0x1000, rows=12, row_length=64, row_stride=64, row_packets=1, src_port=1, dst_port=2, ip=0x0a000001, ip2=0x0a010001)
+
+    def ctrl():
+        yield from tb.configure(**config)
+        yield tb.dut._enable.storage.eq(1)
+        yield from tb.wait(tb.dut._done.status)
+        yield from tb.wait(tb.dut._busy.status, 0)
+
+    tb.run(ctrl())
+    packets = {}
+    for n, ip in enumerate([config["ip"], config["ip2"]]):
+        for words, length, src_port, dst_port, ip_address in tb.received[n]:
+            seq = int.from_bytes(words[0].to_bytes(4, "little"), "big")
+            assert seq % 2 == n and (src_port, dst_port, ip_address) == (1, 2, ip), f"link {n}: packet {seq}"
+            packets[seq] = (words[1:], length - 4)
+    assert [packets[seq] for seq in sorted(packets)] == transfer(**config), "links"
+
+TESTS = [test_transfers, test_commit, test_disable, test_links]
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="UdpWishboneDMAReader simulation.")
+    parser.add_argument("--seed", default=0, type=int, help="Random seed.")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    for test in TESTS:
+        for prefetch_depth in [0, 256]:
+            test(prefetch_depth)
+            print(f"{test.__name__:16s} prefetch {prefetch_depth:3d}: OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+"""Simulate UdpEcho against a behavioral UDP core.
+
+The core is modeled by generators in the eth_50 domain: one injects datagrams into the echo as
+UdpCore.source would, the other consumes the echoes (with random backpressure) as UdpCore.sink
+would and checks them. Reports the echo latency in eth_50 cycles.
+"""
+
+import argparse
+import random
+
+from migen import *
+
+from modules.udp_echo import UdpEcho
+
+# Behavioral core ----------------------------------------------------------------------------------
+
+HOST_IP   = 0xc0a80164 # 192.168.1.100
+HOST_PORT = 40000
+ECHO_PORT = 7
+
+def core_rx(dut, datagrams, cycle, sent):
+    """Received datagrams -> echo sink, records the cycle each datagram is offered."""
+    for _ in range(8): # CSR synchronization.
+        yield
+    for n, payload in enumerate(datagrams):
+        yield dut.sink.ip_address.eq(HOST_IP)
+        yield dut.sink.src_port.eq(HOST_PORT + n)
+        yield dut.sink.dst_port.eq(ECHO_PORT)
+        yield dut.sink.length.eq(4*len(payload))
+        for i, word in enumerate(payload):
+            yield dut.sink.valid.eq(1)
+            yield dut.sink.data.eq(word)
+            yield dut.sink.last.eq(i == (len(payload) - 1))
+            yield
+            if i == 0:
+                sent.append(cycle[0])
+            while not (yield dut.sink.ready):
+                yield
+        yield dut.sink.valid.eq(0)
+        for _ in range(random.randint(0, 4)):
+            yield
+
+def core_tx(dut, datagrams, timestamp, cycle, sent, latencies):
+    """Echo source -> sent datagrams, checks params and payload."""
+    for n, payload in enumerate(datagrams):
+        words = []
+        while True:
+            yield dut.source.ready.eq(random.random() > 0.2)
+            yield
+            if (yield dut.source.valid) and (yield dut.source.ready):
+                if not words:
+                    assert (yield dut.source.ip_address) == HOST_IP
+                    assert (yield dut.source.src_port)   == ECHO_PORT
+                    assert (yield dut.source.dst_port)   == (HOST_PORT + n)
+                    assert (yield dut.source.length)     == 4*(len(payload) + timestamp)
+                    latencies.append(cycle[0] - sent[n])
+                words.append((yield dut.source.data))
+                if (yield dut.source.last):
+                    break
+        assert words[timestamp:] == payload, f"datagram {n}: {words} != {payload}"
+    yield dut.source.ready.eq(0)
+
+@passive
+def cycle_counter(cycle):
+    while True:
+        yield
+        cycle[0] += 1
+
+def set_timestamp(dut, timestamp):
+    yield dut._timestamp.storage.eq(timestamp)
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="UdpEcho simulation.")
+    parser.add_argument("--datagrams", default=64, type=int, help="Number of datagrams.")
+    parser.add_argument("--timestamp", action="store_true",  help="Enable timestamp insertion.")
+    parser.add_argument("--vcd",       default=None,         help="Write a VCD trace.")
+    args = parser.parse_args()
+
+    datagrams = [[random.getrandbits(32) for _ in range(random.randint(1, 16))] for _ in range(args.datagrams)]
+    cycle     = [0]
+    sent      = []
+    latencies = []
+
+    dut = UdpEcho(default_enable=1)
+    run_simulation(dut,
+        generators = {
+            "sys"    : [set_timestamp(dut, int(args.timestamp))],
+            "eth_50" : [
+                cycle_counter(cycle),
+                core_rx(dut, datagrams, cycle, sent),
+                core_tx(dut, datagrams, int(args.timestamp), cycle, sent, latencies),
+            ],
+        },
+        clocks   = {"sys": 10, "eth_50": 20},
+        vcd_name = args.vcd)
+
+    assert len(latencies) == len(datagrams)
+    latencies.sort()
+    print(f"{len(latencies)} datagrams echoed, latency (eth_50 cycles): "
+          f"min {latencies[0]} median {latencies[len(latencies)//2]} max {latencies[-1]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+"""Shared-memory ring for fanning out a received stream to several local processes.
+
+One producer (udp_rx.py --shm NAME) writes datagram payloads into fixed-size slots, any number of
+readers (up to max_readers) follow with their own cursor and get NumPy views into the slots, no
+copies. The producer never waits for readers: a reader that falls more than a ring behind is
+overrun, skips ahead and counts the lost payloads.
+
+    ./udp_rx.py --shm streamliner
+    ./shm_ring.py streamliner          # Attach a reader, print its rate.
+
+Consumers:
+
+    ring = ShmRing("streamliner")
+    for payload in ring.reader(dtype="<u4"):
+        ...                            # View is only valid until the next iteration.
+
+Lock-free by ordering alone: the producer invalidates a slot before filling it and publishes its
+sequence number and the write cursor last, readers check the sequence number before and after
+using a slot. This relies on stores becoming visible in program order (x86 TSO).
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+
+import numpy as np
+
+# Layout -------------------------------------------------------------------------------------------
+
+# Header (64 bytes): magic, nslots, slot_size, max_readers.
+# Write cursor (64 bytes, own cache line).
+# Reader table (64 bytes per reader): pid (0 = free), cursor, lost.
+# Slots (stride rounded to 64 bytes): seq, length, payload.
+
+SHM_DIR    = "/dev/shm"
+RING_MAGIC = 0x53544c52494e4701
+LINE       = 64
+SLOT_META  = 16
+SEQ_BUSY   = np.uint64(2**64 - 1)
+
+def _align(x:int) -> int:
+    return (x + LINE - 1) // LINE * LINE
+
+def _ring_size(nslots:int, slot_size:int, max_readers:int) -> int:
+    return 2*LINE + max_readers*LINE + nslots*_align(SLOT_META + slot_size)
+
+def _alive(pid:int) -> bool:
+    if pid == 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass # Owned by another user.
+    return True
+
+# ShmRing ------------------------------------------------------------------------------------------
+
+class ShmRing:
+    """Single-producer multi-consumer ring in a memory-mapped file.
+
+    Names without a path live in /dev/shm. create=True allocates the ring (producer side, removed
+    again on close), otherwise attaches to an existing one and takes the geometry from its header.
+    """
+    def __init__(self, name:str, create=False, nslots=4096, slot_size=2048, max_readers=16):
+        self.path = name if os.sep in name else os.path.join(SHM_DIR, name)
+        if create:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+            os.ftruncate(fd, _ring_size(nslots, slot_size, max_readers))
+        else:
+            fd = os.open(self.path, os.O_RDWR)
+        try:
+            self.mm = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        self.owner = create
+        buf = self.mm
+
+        header = np.ndarray((4,), np.uint64, buf, 0)
+        if create:
+            header[:] = [RING_MAGIC, nslots, slot_size, max_readers]
+        elif header[0] != RING_MAGIC:
+            raise ValueError(f"{name} is not a ring")
+        self.nslots, self.slot_size, self.max_readers = (int(x) for x in header[1:])
+
+        stride = _align(SLOT_META + self.slot_size)
+        offset = 2*LINE + self.max_readers*LINE
+        self._cursor  = np.ndarray((1,), np.uint64, buf, LINE)
+        self._readers = np.ndarray((self.max_readers, 3), np.uint64, buf, 2*LINE, strides=(LINE, 8))
+        self._meta    = np.ndarray((self.nslots, 2), np.uint64, buf, offset, strides=(stride, 8))
+        self._data    = np.ndarray((self.nslots, self.slot_size), np.uint8, buf, offset + SLOT_META, strides=(stride, 1))
+
+    def close(self):
+        del self._cursor, self._readers, self._meta, self._data
+        try:
+            self.mm.close()
+        except BufferError:
+            pass # Payload views still held elsewhere keep the mapping until they are gone.
+        if self.owner:
+            os.unlink(self.path)
+
+    @property
+    def cursor(self) -> int:
+        """Number of payloads written so far."""
+        return int(self._cursor[0])
+
+    # Producer -------------------------------------------------------------------------------------
+
+    def reserve(self) -> np.ndarray:
+        """Return the next slot's payload buffer to fill in place (e.g. with recv_into), then commit.
+
+        If nothing was written to it after all, cancel hands the previous payload back to readers.
+        """
+        i = self.cursor % self.nslots
+        self._prev       = int(self._meta[i, 0])
+        self._meta[i, 0] = SEQ_BUSY # Readers still holding the previous payload see it is gone.
+        return self._data[i]
+
+    def cancel(self):
+        """Release the reserved slot unchanged (only if nothing was written to it)."""
+        self._meta[self.cursor % self.nslots, 0] = self._prev
+
+    def commit(self, length:int):
+        """Publish the reserved slot with `length` payload bytes."""
+        w = self.cursor
+        i = w % self.nslots
+        self._meta[i, 1] = length
+        self._meta[i, 0] = w
+        self._cursor[0]  = w + 1
+
+    def write(self, payload):
+        """Copy a payload into the ring."""
+        n = len(payload)
+        if n > self.slot_size:
+            raise ValueError(f"Payload of {n} bytes exceeds the slot size ({self.slot_size})")
+        self.reserve()[:n] = np.frombuffer(payload, np.uint8)
+        self.commit(n)
+
+    def readers(self) -> list:
+        """Status of the attached readers: (id, pid, lag, lost)."""
+        w = self.cursor
+        return [(n, int(pid), w - int(cursor), int(lost)) for n, (pid, cursor, lost) in enumerate(self._readers) if pid]
+
+    # Consumer -------------------------------------------------------------------------------------
+
+    def reader(self, reader_id:int=None, dtype=np.uint8) -> "ShmRingReader":
+        return ShmRingReader(self, reader_id, dtype)
+
+# ShmRingReader ------------------------------------------------------------------------------------
+
+class ShmRingReader:
+    """Cursor into a ShmRing, starts at the producer's current position.
+
+    Without reader_id the first free entry of the reader table is claimed, entries of readers whose
+    process is gone are free again; readers registering at the same time should pass distinct ids.
+    """
+    def __init__(self, ring:ShmRing, reader_id:int=None, dtype=np.uint8):
+        self.ring  = ring
+        self.dtype = np.dtype(dtype)
+        table = ring._readers
+        if reader_id is None:
+            free = [n for n in range(ring.max_readers) if not _alive(int(table[n, 0]))]
+            if not free:
+                raise RuntimeError("No free reader entry")
+            reader_id = free[0]
+        self.id    = reader_id
+        self.entry = table[reader_id]
+        self.pos   = ring.cursor
+        self.lost  = 0
+        self.entry[:] = [os.getpid(), self.pos, 0]
+
+    def close(self):
+        self.entry[0] = 0
+        del self.entry
+
+    def peek(self):
+        """View of the next payload, None if the reader caught up with the producer."""
+        ring = self.ring
+        while True:
+            w = ring.cursor
+            r = self.pos
+            if w == r:
+                return None
+            if w - r >= ring.nslots:
+                # Overrun, skip to the oldest slot the producer is not about to refill.
+                self._move(w - ring.nslots + 1 - r, lost=True)
+                continue
+            i = r % ring.nslots
+            if int(ring._meta[i, 0]) != r:
+                self._move(1, lost=True) # Refilled between reading the cursor and the slot.
+                continue
+            return ring._data[i, :int(ring._meta[i, 1])].view(self.dtype)
+
+    def advance(self) -> bool:
+        """Release the payload returned by peek, False if it was overwritten while in use."""
+        i  = self.pos % self.ring.nslots
+        ok = int(self.ring._meta[i, 0]) == self.pos
+        self._move(1, lost=not ok)
+        return ok
+
+    def read(self, timeout:float=None):
+        """Wait for the next payload (spin, then back off to short sleeps), None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        spins = 0
+        while True:
+            payload = self.peek()
+            if payload is not None:
+                return payload
+            spins += 1
+            if spins > 1000:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+                time.sleep(50e-6)
+
+    def __iter__(self):
+        """Yield payload views, each is released when the next one is requested."""
+        while True:
+            payload = self.read()
+            yield payload
+            self.advance()
+
+    def _move(self, n:int, lost:bool):
+        if lost:
+            self.lost    += n
+            self.entry[2] = self.lost
+        self.pos += n
+        self.entry[1] = self.pos
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Attach to a Streamliner shared-memory ring and report the rate.")
+    parser.add_argument("name",       help="Ring name (udp_rx.py --shm).")
+    parser.add_argument("--reader",   default=None, type=int, help="Reader table entry (default: first free).")
+    args = parser.parse_args()
+
+    ring   = ShmRing(args.name)
+    reader = ring.reader(args.reader)
+    start  = last = time.monotonic()
+    packets = nbytes = 0
+    try:
+        while True:
+            payload = reader.read(timeout=1.0)
+            if payload is not None:
+                packets += 1
+                nbytes  += len(payload)
+                reader.advance()
+            now = time.monotonic()
+            if now - last >= 1.0:
+                print(f"{packets/(now - start):10.0f} pkt/s {8*nbytes/(now - start)/1e6:8.1f} Mbit/s lost {reader.lost}", file=sys.stderr)
+                last = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+        ring.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""Shared-memory ring benchmark: consumer throughput versus number of readers.
+
+A producer process writes payloads into a ShmRing as fast as possible (or at --rate), 1..N reader
+processes follow it and touch every payload. Reports the producer rate, the per-reader and
+aggregate consumer throughput and the fraction of payloads the readers lost to overruns:
+
+    ./shm_ring_bench.py --readers 1 2 4 8 --size 1472 --duration 3
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from shm_ring import ShmRing
+
+# Processes ----------------------------------------------------------------------------------------
+
+def producer(name, size, rate, duration, start, written):
+    ring     = ShmRing(name)
+    payload  = np.arange(size, dtype=np.uint8)
+    interval = 1/rate if rate else 0
+    start.wait()
+    t0 = time.perf_counter()
+    n  = 0
+    while time.perf_counter() - t0 < duration:
+        ring.write(payload)
+        n += 1
+        if interval:
+            while time.perf_counter() < t0 + n*interval:
+                pass
+    written.value = n
+    ring.close()
+
+def reader(name, reader_id, work, start, stop, results):
+    ring   = ShmRing(name)
+    rd     = ring.reader(reader_id)
+    start.wait()
+    # Timed from the first payload to the end of the last one, not the startup/drain around them.
+    t0     = t1 = None
+    n      = nbytes = 0
+    while not stop.is_set():
+        payload = rd.read(timeout=0.1)
+        if payload is None:
+            continue
+        if t0 is None:
+            t0 = time.perf_counter()
+        if work == "sum":
+            payload.sum()
+        else:
+            payload[0]
+        nbytes += len(payload)
+        n      += 1
+        rd.advance()
+        t1 = time.perf_counter()
+    results.put((n, nbytes, rd.lost, t1 - t0 if n else 0))
+    rd.close()
+    ring.close()
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def run(nreaders, args):
+    name = f"shm_ring_bench_{mp.current_process().pid}"
+    ring = ShmRing(name, create=True, nslots=args.slots, slot_size=args.size)
+    start   = mp.Barrier(nreaders + 1)
+    stop    = mp.Event()
+    results = mp.Queue()
+    written = mp.Value("Q", 0)
+
+    readers = [mp.Process(target=reader, args=(name, n, args.work, start, stop, results)) for n in range(nreaders)]
+    for p in readers:
+        p.start()
+    time.sleep(0.2) # Readers registered.
+    prod = mp.Process(target=producer, args=(name, args.size, args.rate, args.duration, start, written))
+    prod.start()
+    prod.join()
+    time.sleep(0.2) # Readers drain.
+    stop.set()
+    stats = [results.get() for _ in readers]
+    for p in readers:
+        p.join()
+    ring.close()
+
+    produced  = written.value
+    rates     = [nbytes/elapsed if elapsed else 0 for _, nbytes, _, elapsed in stats]
+    lost      = sum(l for _, _, l, _ in stats)
+    print(f"{nreaders:7d} {produced/args.duration:12.0f} {8*np.mean(rates)/1e9:14.2f} {8*sum(rates)/1e9:14.2f} "
+          f"{100*lost/max(1, produced*nreaders):8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared-memory ring benchmark.")
+    parser.add_argument("--readers",  default=[1, 2, 4], type=int, nargs="+", help="Numbers of readers to run.")
+    parser.add_argument("--size",     default=1472, type=int,   help="Payload size in bytes.")
+    parser.add_argument("--slots",    default=4096, type=int,   help="Ring size in payloads.")
+    parser.add_argument("--rate",     default=0, type=float,    help="Producer payloads/s, 0 for as fast as possible.")
+    parser.add_argument("--duration", default=3.0, type=float,  help="Duration per run in seconds.")
+    parser.add_argument("--work",     default="touch", choices=["touch", "sum"], help="Per payload work: read one element or sum it.")
+    args = parser.parse_args()
+
+    print(f"{'readers':>7} {'produced/s':>12} {'Gbit/s/reader':>14} {'Gbit/s total':>14} {'lost %':>8}")
+    for nreaders in args.readers:
+        run(nreaders, args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""Control the Streamliner UDP DMA over the UDP command channel (SoC built with --with-udp-cmd).
+
+    ./udp_cmd.py start --base 0x40000000 --length 1024 --ip 192.168.1.100 --port 5123
+    ./udp_cmd.py status
+    ./udp_cmd.py stop
+"""
+
+import argparse
+import socket
+import struct
+
+from functools import reduce
+
+# Protocol -----------------------------------------------------------------------------------------
+
+CMD_MAGIC  = 0x534c
+CMD_START  = 0x01
+CMD_STOP   = 0x02
+CMD_STATUS = 0x03
+
+def str_ip4_to_num(x:str) -> int:
+    return reduce(lambda x,y: x|y, map(lambda ix: (int(ix[1]) << (8 * ix[0])), enumerate(reversed(x.split(".")))))
+
+# UdpCommandClient ---------------------------------------------------------------------------------
+
+class UdpCommandClient:
+    def __init__(self, board_ip="192.168.1.50", port=5000, timeout=1.0):
+        self.addr = (board_ip, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(timeout)
+
+    def close(self):
+        self.sock.close()
+
+    def request(self, opcode:int, *args:int) -> dict:
+        self.sock.sendto(struct.pack(f">I{len(args)}I", (CMD_MAGIC << 16) | opcode, *args), self.addr)
+        reply, _ = self.sock.recvfrom(64)
+        header, flags, offset, packets = struct.unpack(">4I", reply[:16])
+        if header != (CMD_MAGIC << 16) | opcode:
+            raise ValueError(f"Unexpected reply 0x{header:08x}")
+        return dict(enable=bool(flags & 1), done=bool(flags & 2), offset=offset, packets=packets)
+
+    def start(self, base:int, length:int, ip:str, port:int, src_port:int=None) -> dict:
+        src_port = port if src_port is None else src_port
+        return self.request(CMD_START, base, length, str_ip4_to_num(ip), (port << 16) | src_port)
+
+    def stop(self) -> dict:
+        return self.request(CMD_STOP)
+
+    def status(self) -> dict:
+        return self.request(CMD_STATUS)
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamliner UDP command channel.")
+    parser.add_argument("command",    choices=["start", "stop", "status"])
+    parser.add_argument("--board-ip", default="192.168.1.50",      help="Board IP address.")
+    parser.add_argument("--cmd-port", default=5000, type=int,       help="UDP command port.")
+    parser.add_argument("--base",     default=0x40000000, type=lambda x: int(x, 0), help="DMA base address.")
+    parser.add_argument("--length",   default=1024, type=lambda x: int(x, 0),       help="DMA length in bytes.")
+    parser.add_argument("--ip",       default="192.168.1.100",     help="Destination IP address.")
+    parser.add_argument("--port",     default=5123, type=int,       help="Destination UDP port.")
+    args = parser.parse_args()
+
+    client = UdpCommandClient(args.board_ip, args.cmd_port)
+    try:
+        if args.command == "start":
+            print(client.start(args.base, args.length, args.ip, args.port))
+        elif args.command == "stop":
+            print(client.stop())
+        else:
+            print(client.status())
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""Round-trip latency / echo throughput benchmark (SoC built with --with-udp-echo).
+
+Blasts datagrams at the board's echo, every datagram carries a sequence number and the host send
+time, and reports RTT percentiles and the echoed throughput:
+
+    ./udp_echo_bench.py --board-ip 192.168.1.50 --size 1024 --rate 10000 --duration 5
+
+With --timestamp (echo timestamp CSR set) the board's eth_50 counter at the time of every echo is
+decoded as well: the echo spacing on the board in eth_50 cycles, and the RTT split into its
+host -> board and board -> host parts. The clocks are not synchronized, so the one-way delays are
+reported relative to their minimum (queueing/jitter per direction, clock drift ignored).
+"""
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+# Helpers ------------------------------------------------------------------------------------------
+
+HEADER    = struct.Struct(">IQ") # Sequence number, host send time (ns).
+TIMESTAMP = struct.Struct(">I")  # Board eth_50 cycle counter (echo timestamp mode).
+
+# Benchmark ----------------------------------------------------------------------------------------
+
+def sender(sock, addr, size, rate, duration, sent):
+    payload  = bytearray(size)
+    interval = 1/rate if rate else 0
+    start    = time.perf_counter()
+    seq      = 0
+    while True:
+        now = time.perf_counter()
+        if now - start >= duration:
+            break
+        HEADER.pack_into(payload, 0, seq, time.perf_counter_ns())
+        sock.sendto(payload, addr)
+        seq += 1
+        if interval:
+            next_time = start + seq*interval
+            while time.perf_counter() < next_time:
+                pass
+    sent[0] = seq
+
+def receiver(sock, timestamp, echoes, received, stop):
+    buf    = bytearray(65536)
+    offset = TIMESTAMP.size if timestamp else 0
+    while not stop.is_set():
+        try:
+            n = sock.recv_into(buf)
+        except socket.timeout:
+            continue
+        now = time.perf_counter_ns()
+        if n < offset + HEADER.size:
+            continue
+        _, t_sent = HEADER.unpack_from(buf, offset)
+        t_board,  = TIMESTAMP.unpack_from(buf) if timestamp else (0,)
+        echoes.append((t_sent, now, t_board))
+        received[0] += n - offset
+
+def percentiles(x):
+    p50, p90, p99, p999 = np.percentile(x, [50, 90, 99, 99.9])
+    return f"min {x.min():.1f} p50 {p50:.1f} p90 {p90:.1f} p99 {p99:.1f} p99.9 {p999:.1f} max {x.max():.1f}"
+
+def board_stats(echoes, eth_clk):
+    t_sent, t_recv, ticks = np.array(echoes, dtype=np.int64).T
+    # Unwrap the 32-bit counter, echoes arrive in the order the board sent them.
+    ticks = np.concatenate([[0], np.cumsum(np.diff(ticks) % (1 << 32))])
+    spacing = np.diff(ticks)
+    print(f"board echo spacing (eth_50 cycles): {percentiles(spacing)}")
+    print(f"board echo rate: {len(spacing)*eth_clk/max(1, ticks[-1]):.0f} datagrams/s")
+    t_board = ticks*1e9/eth_clk
+    to_board   = t_board - t_sent
+    from_board = t_recv - t_board
+    print(f"host -> board delay above min (us): {percentiles((to_board - to_board.min())/1e3)}")
+    print(f"board -> host delay above min (us): {percentiles((from_board - from_board.min())/1e3)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamliner UDP echo benchmark.")
+    parser.add_argument("--board-ip",  default="192.168.1.50",    help="Board IP address.")
+    parser.add_argument("--port",      default=5124, type=int,     help="Echo UDP port (any port but the command port).")
+    parser.add_argument("--size",      default=1024, type=int,     help="Payload size in bytes (multiple of 4).")
+    parser.add_argument("--rate",      default=0, type=float,      help="Datagrams/s, 0 for as fast as possible.")
+    parser.add_argument("--duration",  default=5.0, type=float,    help="Duration in seconds.")
+    parser.add_argument("--timestamp", action="store_true",        help="Echo prepends its timestamp (decode board-side timing).")
+    parser.add_argument("--eth-clk",   default=50e6, type=float,   help="Frequency of the board's eth_50 timestamp counter.")
+    args = parser.parse_args()
+
+    assert args.size >= HEADER.size and args.size % 4 == 0
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+    sock.bind(("0.0.0.0", 0))
+    sock.settimeout(0.1)
+
+    echoes   = []
+    sent     = [0]
+    received = [0]
+    stop     = threading.Event()
+    rx = threading.Thread(target=receiver, args=(sock, args.timestamp, echoes, received, stop))
+    rx.start()
+    start = time.perf_counter()
+    sender(sock, (args.board_ip, args.port), args.size, args.rate, args.duration, sent)
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5) # Drain in-flight echoes.
+    stop.set()
+    rx.join()
+    sock.close()
+
+    print(f"sent {sent[0]} received {len(echoes)} lost {sent[0] - len(echoes)}")
+    if echoes:
+        rtt = np.array([t_recv - t_sent for t_sent, t_recv, _ in echoes])/1e3
+        print(f"RTT (us): {percentiles(rtt)}")
+        print(f"echo throughput: {8*received[0]/elapsed/1e6:.1f} Mbit/s, {len(echoes)/elapsed:.0f} datagrams/s")
+    if args.timestamp and len(echoes) > 1:
+        board_stats(echoes, args.eth_clk)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+"""Receive a Streamliner UDP stream on the host.
+
+Single link:
+
+    ./udp_rx.py --bind 192.168.1.100
+
+Dual PHY (SoC built with --eth-dual-phy, links in their own subnets 192.168.1.0/24 and
+192.168.2.0/24, dst_ip = 192.168.1.100 and dst_ip2 = 192.168.2.100), one socket per link, packets
+are reordered by the 32-bit sequence number the striper prepends:
+
+    ./udp_rx.py --bind 192.168.1.100 --bind 192.168.2.100 --striped
+
+Fan-out to local processes through a shared-memory ring (see shm_ring.py):
+
+    ./udp_rx.py --shm streamliner
+"""
+
+import argparse
+import selectors
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+
+from shm_ring import ShmRing
+
+# Helpers ------------------------------------------------------------------------------------------
+
+SEQ_HEADER = struct.Struct(">I")
+SEQ_MOD    = 1 << 32
+
+def open_socket(addr:str, port:int, rcvbuf:int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind((addr, port))
+    sock.setblocking(False)
+    return sock
+
+def unpack_samples(payload, width:int, count:int=None) -> np.ndarray:
+    """Unpack LSB first packed `width`-bit samples (SoC built with --with-udp-packer).
+
+    The zero padding of the last word decodes as extra samples unless `count` is given.
+    """
+    if width in (8, 16, 32):
+        samples = np.frombuffer(payload, dtype=f"<u{width//8}")
+    else:
+        bits    = np.unpackbits(np.frombuffer(payload, dtype=np.uint8), bitorder="little")
+        n       = len(bits)//width
+        weights = np.left_shift(np.uint32(1), np.arange(width, dtype=np.uint32))
+        samples = bits[:n*width].reshape(n, width).astype(np.uint32) @ weights
+    return samples if count is None else samples[:count]
+
+# Reorder ------------------------------------------------------------------------------------------
+
+class Reorder:
+    """Restore the order of a striped stream by its sequence number.
+
+    Packets that are still missing once `window` later packets arrived are counted as lost.
+    """
+    def __init__(self, window=64):
+        self.window   = window
+        self.expected = None
+        self.pending  = {}
+        self.lost     = 0
+
+    def push(self, seq:int, payload):
+        """Add a packet, returns the payloads that are now in order."""
+        if self.expected is None:
+            self.expected = seq
+        if (seq - self.expected) % SEQ_MOD >= SEQ_MOD // 2:
+            return [] # Late duplicate or already skipped.
+        self.pending[seq] = payload
+
+        out = []
+        while True:
+            if self.expected in self.pending:
+                out.append(self.pending.pop(self.expected))
+                self.expected = (self.expected + 1) % SEQ_MOD
+            elif len(self.pending) > self.window:
+                self.lost    += 1
+                self.expected = (self.expected + 1) % SEQ_MOD
+            else:
+                return out
+
+# Receiver -----------------------------------------------------------------------------------------
+
+class Receiver:
+    def __init__(self, binds, port, striped=False, rcvbuf=8 << 20, window=64):
+        self.socks    = [open_socket(addr, port, rcvbuf) for addr in binds]
+        self.striped  = striped
+        self.reorder  = Reorder(window) if striped else None
+        self.oversize = 0 # Datagrams dropped as larger than a ring slot.
+        self.sel      = selectors.DefaultSelector()
+        for sock in self.socks:
+            self.sel.register(sock, selectors.EVENT_READ)
+
+    def close(self):
+        self.sel.close()
+        for sock in self.socks:
+            sock.close()
+
+    def packets(self, ring:ShmRing=None):
+        """Yield the payloads of the received datagrams (in order when striped).
+
+        With a ring the payloads are also published there. Unless they need reordering, datagrams
+        are received straight into its slots (no copy). Datagrams larger than a slot are dropped
+        and counted in oversize.
+        """
+        buf    = bytearray(65536)
+        view   = memoryview(buf)
+        direct = ring is not None and not self.striped
+        while True:
+            for key, _ in self.sel.select(timeout=1.0):
+                while True:
+                    if direct:
+                        slot = ring.reserve()
+                        try:
+                            n, _, flags, _ = key.fileobj.recvmsg_into([slot])
+                        except BlockingIOError:
+                            ring.cancel()
+                            break
+                        if flags & socket.MSG_TRUNC:
+                            self.oversize += 1 # Slot stays invalid, it is reused for the next one.
+                            continue
+                        ring.commit(n)
+                        yield slot[:n]
+                        continue
+                    try:
+                        n = key.fileobj.recv_into(buf)
+                    except BlockingIOError:
+                        break
+                    if not self.striped:
+                        yield view[:n]
+                        continue
+                    if n < SEQ_HEADER.size:
+                        continue
+                    seq, = SEQ_HEADER.unpack_from(buf)
+                    for payload in self.reorder.push(seq, bytes(view[SEQ_HEADER.size:n])):
+                        if ring is not None:
+                            if len(payload) > ring.slot_size:
+                                self.oversize += 1
+                                continue
+                            ring.write(payload)
+                        yield payload
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamliner UDP receiver.")
+    parser.add_argument("--bind",     action="append",  help="Local address to receive on, once per link (default: 0.0.0.0).")
+    parser.add_argument("--port",     default=5123, type=int, help="UDP port.")
+    parser.add_argument("--striped",  action="store_true",    help="Stream is striped over several links (sequence header).")
+    parser.add_argument("--window",   default=64, type=int,   help="Reorder window in packets.")
+    parser.add_argument("--output",   default=None,           help="Write the payloads to this file.")
+    parser.add_argument("--unpack",   default=None, type=int, help="Unpack samples of this width before writing them (as uint16/uint32).")
+    parser.add_argument("--duration", default=None, type=float, help="Stop after this many seconds.")
+    parser.add_argument("--shm",      default=None,           help="Publish the payloads in a shared-memory ring of this name.")
+    parser.add_argument("--shm-slots", default=4096, type=int, help="Ring size in payloads.")
+    parser.add_argument("--shm-slot-size", default=2048, type=int, help="Maximum payload size in bytes.")
+    args = parser.parse_args()
+
+    rx   = Receiver(args.bind or ["0.0.0.0"], args.port, striped=args.striped, window=args.window)
+    out  = open(args.output, "wb") if args.output else None
+    ring = ShmRing(args.shm, create=True, nslots=args.shm_slots, slot_size=args.shm_slot_size) if args.shm else None
+
+    start = last = time.monotonic()
+    packets = nbytes = 0
+    try:
+        for payload in rx.packets(ring):
+            packets += 1
+            nbytes  += len(payload)
+            if out is not None:
+                if args.unpack is None:
+                    out.write(payload)
+                else:
+                    samples = unpack_samples(payload, args.unpack)
+                    out.write(samples.astype(np.uint16 if args.unpack <= 16 else np.uint32).tobytes())
+            now = time.monotonic()
+            if now - last >= 1.0:
+                lost = rx.reorder.lost if rx.reorder else 0
+                print(f"{packets/(now - start):10.0f} pkt/s {8*nbytes/(now - start)/1e6:8.1f} Mbit/s lost {lost} oversize {rx.oversize}", file=sys.stderr)
+                last = now
+            if args.duration is not None and now - start >= args.duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rx.close()
+        if out is not None:
+            out.close()
+        if ring is not None:
+            ring.close()
+
+if __name__ == "__main__":
+    main()